@@ -2,12 +2,37 @@
 分析 API
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, status
 from typing import List, Optional, Dict, Any
 import math
 
+import numpy as np
+
 router = APIRouter()
 
+# 支持的图表类型
+_VALID_CHARTS = frozenset({
+    "speedHeatmap", "trajectory", "anomalyDistribution",
+    "recoveryCurve", "laneChanges", "vehicleTypes",
+    "laneDistribution", "safetyAnalysis", "delay",
+    "fundamentalDiagram", "etcPerformance"
+})
+
+# 图表标注: (标题, x 轴标签, y 轴标签)
+_CHART_CONFIG = {
+    "speedHeatmap": ("车速热力图", "时间", "路段"),
+    "trajectory": ("时空轨迹图", "时间 (秒)", "位置 (km)"),
+    "anomalyDistribution": ("异常分布图", "路段", "异常事件数"),
+    "recoveryCurve": ("拥堵恢复曲线", "", ""),
+    "laneChanges": ("换道分析", "时间", "换道次数"),
+    "vehicleTypes": ("车辆类型分布", "车辆类型", "车辆数"),
+    "laneDistribution": ("车道分布", "", ""),
+    "safetyAnalysis": ("安全分析", "", ""),
+    "delay": ("累计延误", "路段区间", "延误 (秒)"),
+    "fundamentalDiagram": ("基本图", "密度 (veh/km)", "流量 (veh/h)"),
+    "etcPerformance": ("ETC性能", "", ""),
+}
+
 
 @router.get("/{simulation_id}/summary")
 async def get_analysis_summary(simulation_id: str) -> dict:
@@ -47,32 +72,27 @@ async def get_analysis_summary(simulation_id: str) -> dict:
 async def get_chart_data(
     simulation_id: str,
     chart_type: str,
-    time_range: Optional[str] = Query(None, regex="^\\d+-\\d+$"),
+    time_range: Optional[str] = Query(None, pattern="^\\d+-\\d+$"),
     segments: Optional[List[int]] = Query(None)
 ) -> Dict[str, Any]:
     """获取图表数据"""
-    valid_charts = [
-        "speedHeatmap", "trajectory", "anomalyDistribution",
-        "recoveryCurve", "laneChanges", "vehicleTypes",
-        "laneDistribution", "safetyAnalysis", "delay",
-        "fundamentalDiagram", "etcPerformance"
-    ]
-    
-    if chart_type not in valid_charts:
+    if chart_type not in _VALID_CHARTS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"无效的图表类型: {chart_type}"
         )
     
+    title, x_label, y_label = _CHART_CONFIG.get(chart_type, (chart_type, "", ""))
+
     # 返回模拟数据
     return {
         "chart_type": chart_type,
         "simulation_id": simulation_id,
         "data": generate_mock_chart_data(chart_type),
         "config": {
-            "title": get_chart_title(chart_type),
-            "x_label": get_chart_xlabel(chart_type),
-            "y_label": get_chart_ylabel(chart_type)
+            "title": title,
+            "x_label": x_label,
+            "y_label": y_label
         }
     }
 
@@ -121,92 +141,79 @@ async def get_detailed_statistics(simulation_id: str) -> dict:
     }
 
 
-def generate_mock_chart_data(chart_type: str) -> dict:
-    """生成模拟图表数据"""
-    data_generators = {
-        "speedHeatmap": lambda: {
+def _speed_heatmap_values(segments: np.ndarray, time_bins: np.ndarray) -> np.ndarray:
+    """区间 × 时间的速度矩阵"""
+    return np.add.outer(segments, time_bins) % 30 + 60
+
+
+def _trajectory_positions(vehicle_ids: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """车辆 × 时间的位置矩阵，一次广播得到全部轨迹"""
+    return np.add.outer(vehicle_ids * 15, times * 0.5)
+
+
+def _fundamental_diagram(density: np.ndarray) -> tuple:
+    """由密度序列计算 (流量, 速度)"""
+    return density * (80 - density) / 5, 80 - density * 0.8
+
+
+def _build_mock_chart_data() -> Dict[str, dict]:
+    """预先构建全部模拟图表数据（模块导入时执行一次）"""
+    seg10 = np.arange(10)
+    t20 = np.arange(20)
+    traj_times = np.arange(0, 600, 10)
+    density = np.arange(0, 80, 5)
+    flow, speed = _fundamental_diagram(density)
+
+    return {
+        "speedHeatmap": {
             "segments": [f"{i}-{i+1}km" for i in range(10)],
             "time_points": [f"{i*5}min" for i in range(20)],
-            "values": [[60 + (i + j) % 30 for j in range(20)] for i in range(10)]
+            "values": _speed_heatmap_values(seg10, t20).tolist()
         },
-        "trajectory": lambda: {
+        "trajectory": {
             "vehicles": [
-                {"id": i, "times": list(range(0, 600, 10)), "positions": [i * 15 + t * 0.5 for t in range(0, 600, 10)]}
-                for i in range(50)
+                {"id": i, "times": traj_times.tolist(), "positions": row}
+                for i, row in enumerate(
+                    _trajectory_positions(np.arange(50), traj_times).tolist()
+                )
             ]
         },
-        "anomalyDistribution": lambda: {
+        "anomalyDistribution": {
             "segments": [f"区间{i+1}" for i in range(10)],
-            "type1": [8 - i for i in range(10)],
-            "type2": [5 + (i % 3) for i in range(10)],
-            "type3": [3 + (i % 4) for i in range(10)]
+            "type1": (8 - seg10).tolist(),
+            "type2": (5 + seg10 % 3).tolist(),
+            "type3": (3 + seg10 % 4).tolist()
         },
-        "laneChanges": lambda: {
+        "laneChanges": {
             "time_intervals": [f"{i*5}-{(i+1)*5}min" for i in range(20)],
-            "free_changes": [50 + (i % 10) * 5 for i in range(20)],
-            "forced_changes": [10 + (i % 5) * 2 for i in range(20)]
+            "free_changes": (50 + (t20 % 10) * 5).tolist(),
+            "forced_changes": (10 + (t20 % 5) * 2).tolist()
         },
-        "vehicleTypes": lambda: {
+        "vehicleTypes": {
             "labels": ["轿车", "卡车", "客车"],
             "values": [720, 285, 180],
             "colors": ["#1f77b4", "#ff7f0e", "#2ca02c"]
         },
-        "delay": lambda: {
+        "delay": {
             "segments": [f"区间{i+1}" for i in range(10)],
-            "total_delay": [150 + i * 20 for i in range(10)],
-            "avg_delay": [0.5 + i * 0.1 for i in range(10)]
+            "total_delay": (150 + seg10 * 20).tolist(),
+            "avg_delay": (0.5 + seg10 * 0.1).tolist()
         },
-        "fundamentalDiagram": lambda: {
-            "density": list(range(0, 80, 5)),
-            "flow": [d * (80 - d) / 5 for d in range(0, 80, 5)],
-            "speed": [80 - d * 0.8 for d in range(0, 80, 5)]
+        "fundamentalDiagram": {
+            "density": density.tolist(),
+            "flow": flow.tolist(),
+            "speed": speed.tolist()
         }
     }
-    
-    generator = data_generators.get(chart_type)
-    if generator:
-        return generator()
-    return {"message": f"No mock data for {chart_type}"}
 
 
-def get_chart_title(chart_type: str) -> str:
-    titles = {
-        "speedHeatmap": "车速热力图",
-        "trajectory": "时空轨迹图",
-        "anomalyDistribution": "异常分布图",
-        "recoveryCurve": "拥堵恢复曲线",
-        "laneChanges": "换道分析",
-        "vehicleTypes": "车辆类型分布",
-        "laneDistribution": "车道分布",
-        "safetyAnalysis": "安全分析",
-        "delay": "累计延误",
-        "fundamentalDiagram": "基本图",
-        "etcPerformance": "ETC性能"
-    }
-    return titles.get(chart_type, chart_type)
-
-
-def get_chart_xlabel(chart_type: str) -> str:
-    xlabels = {
-        "speedHeatmap": "时间",
-        "trajectory": "时间 (秒)",
-        "anomalyDistribution": "路段",
-        "laneChanges": "时间",
-        "vehicleTypes": "车辆类型",
-        "delay": "路段区间",
-        "fundamentalDiagram": "密度 (veh/km)"
-    }
-    return xlabels.get(chart_type, "")
-
-
-def get_chart_ylabel(chart_type: str) -> str:
-    ylabels = {
-        "speedHeatmap": "路段",
-        "trajectory": "位置 (km)",
-        "anomalyDistribution": "异常事件数",
-        "laneChanges": "换道次数",
-        "vehicleTypes": "车辆数",
-        "delay": "延误 (秒)",
-        "fundamentalDiagram": "流量 (veh/h)"
-    }
-    return ylabels.get(chart_type, "")
+# 模拟数据为静态内容，导入时生成一次，请求时直接复用
+_MOCK_CACHE: Dict[str, dict] = _build_mock_chart_data()
+
+
+def generate_mock_chart_data(chart_type: str) -> dict:
+    """生成模拟图表数据"""
+    data = _MOCK_CACHE.get(chart_type)
+    if data is not None:
+        return data
+    return {"message": f"No mock data for {chart_type}"}
@@ -3,18 +3,24 @@
 提供图表列表、获取、收藏、下载、生成功能
 """
 
-from fastapi import APIRouter, HTTPException, Body, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Body, BackgroundTasks, Request
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import shutil
 import os
-import json
-import subprocess
 import sys
+import asyncio
+import logging
 from datetime import datetime
+from functools import lru_cache, partial
+
+from ..services import plotter_pool
+from ..services.dir_index import DirIndex, invalidate_tree_listings
+from ..services.file_response import file_response
+from ..services.json_io import write_json
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # 图表目录配置
@@ -29,10 +35,21 @@ FAVORITES_DIR = ETC_SIM_DIR / "data" / "charts" / "favorites"
 # Global state for latest batch
 LATEST_BATCH_DIR = None
 
+# 运行中的绘图进程等待任务 (保持引用直至进程退出)
+_plotter_tasks: set = set()
+
 # 确保目录存在
 CHARTS_DIR.mkdir(parents=True, exist_ok=True)
 FAVORITES_DIR.mkdir(parents=True, exist_ok=True)
 
+# 图表文件扩展名 (按优先级)
+CHART_SUFFIXES = (".png", ".gif")
+
+# 目录索引 (目录 mtime 不变时查找只需字典查询)
+CHARTS_INDEX = DirIndex(CHARTS_DIR, CHART_SUFFIXES)
+FAVORITES_INDEX = DirIndex(FAVORITES_DIR, CHART_SUFFIXES)
+_batch_index: Optional[DirIndex] = None
+
 # 图表元数据
 CHART_METADATA = {
     "speed_profile": {"name": "车流画像", "description": "分区间的车辆速度-时间轨迹"},
@@ -67,32 +84,132 @@ def get_current_charts_dir() -> Path:
     return CHARTS_DIR
 
 
+def _current_index() -> DirIndex:
+    """获取当前图表目录对应的索引"""
+    global _batch_index
+    current_dir = get_current_charts_dir()
+    if current_dir == CHARTS_DIR:
+        return CHARTS_INDEX
+    if _batch_index is None or _batch_index.path != current_dir:
+        _batch_index = DirIndex(current_dir, CHART_SUFFIXES)
+    return _batch_index
+
+
 def get_chart_path(chart_id: str) -> Path:
     """获取图表文件路径"""
-    current_dir = get_current_charts_dir()
+    current_index = _current_index()
     
     # 尝试 PNG 和 GIF 扩展名
-    for ext in [".png", ".gif"]:
-        path = current_dir / f"{chart_id}{ext}"
-        if path.exists():
-            return path
+    path = current_index.find(chart_id, CHART_SUFFIXES)
+    if path is not None:
+        return path
             
     # Fallback to default charts dir if not found in latest batch
-    if current_dir != CHARTS_DIR:
-        for ext in [".png", ".gif"]:
-            path = CHARTS_DIR / f"{chart_id}{ext}"
-            if path.exists():
-                return path
+    if current_index is not CHARTS_INDEX:
+        return CHARTS_INDEX.find(chart_id, CHART_SUFFIXES)
                 
     return None
 
 
+@lru_cache(maxsize=1)
+def _resolve_plotter_python() -> str:
+    """查找用于运行绘图脚本的 python (优先 low_numpy 环境)，首次解析后缓存"""
+    # 假设当前是 D:\Anaconda3\python.exe
+    current_python = Path(sys.executable)
+    possible_envs_paths = [
+        # 标准 Anaconda/Miniconda envs 目录
+        current_python.parent / "envs" / "low_numpy" / "python.exe",
+        current_python.parent.parent / "envs" / "low_numpy" / "python.exe",
+        # 常见路径
+        Path("D:/Anaconda3/envs/low_numpy/python.exe"),
+        Path("C:/Anaconda3/envs/low_numpy/python.exe"),
+        Path(os.path.expanduser("~")) / "anaconda3" / "envs" / "low_numpy" / "python.exe",
+        Path(os.path.expanduser("~")) / "miniconda3" / "envs" / "low_numpy" / "python.exe",
+    ]
+
+    for p in possible_envs_paths:
+        if p.exists():
+            logger.info("Found specific python env: %s", p)
+            return str(p)
+    return sys.executable
+
+
+def _invalidate_after_plotting(batch_dir: Path):
+    """绘图结束后失效列表缓存：重新生成会原地覆写同名图表文件，目录 mtime 不变"""
+    invalidate_tree_listings(batch_dir)
+    invalidate_chart_indexes()
+
+
+def _report_plotter_result(batch_dir: Path, future):
+    """进程池任务完成回调：失效列表缓存并记录失败信息"""
+    _invalidate_after_plotting(batch_dir)
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Plotter batch failed: %s", exc)
+
+
+async def _launch_plotter_process(target_python: str, data_file: Path, batch_dir: Path, theme: str):
+    """以独立子进程运行 plotter.py"""
+    # Correct path to plotter.py
+    script_path = ETC_SIM_DIR / "backend" / "plotter.py"
+    cmd = [target_python, str(script_path), str(data_file), str(batch_dir), "--theme", theme]
+    
+    # Redirect output to file for debugging
+    log_path = batch_dir / "launcher.log"
+    log_file = await asyncio.to_thread(open, log_path, "w")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=log_file, stderr=log_file
+        )
+    finally:
+        log_file.close()
+    # 持有进程引用直到退出，避免子进程 transport 被回收时连带终止绘图进程
+    task = asyncio.create_task(process.wait())
+    _plotter_tasks.add(task)
+    task.add_done_callback(_plotter_tasks.discard)
+    task.add_done_callback(lambda _: _invalidate_after_plotting(batch_dir))
+    
+    logger.info("Launching plotter: %s > %s", cmd, log_path)
+
+
+def _copy_chart(src: Path, dest: Path):
+    """复制收藏图表：优先 copy_file_range (内核内复制，支持的文件系统上为 reflink)，不可用时回退为 copy2
+
+    不使用硬链接：重新生成图表会原地覆写同名文件，硬链接的收藏副本会被一并改写。
+    """
+    # 先删除旧收藏：它可能是早先创建的硬链接，直接截断写入会改写原图表
+    try:
+        dest.unlink()
+    except FileNotFoundError:
+        pass
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(src, dest)
+                return
+        except OSError:
+            pass  # 跨文件系统 (旧内核) 或文件系统不支持
+    shutil.copy2(src, dest)
+
+
+def invalidate_chart_indexes():
+    """主动失效图表与收藏目录索引"""
+    CHARTS_INDEX.invalidate()
+    FAVORITES_INDEX.invalidate()
+    if _batch_index is not None:
+        _batch_index.invalidate()
+
+
 def is_favorited(chart_id: str) -> bool:
     """检查图表是否已收藏"""
-    for ext in [".png", ".gif"]:
-        if (FAVORITES_DIR / f"{chart_id}{ext}").exists():
-            return True
-    return False
+    return FAVORITES_INDEX.find(chart_id, CHART_SUFFIXES) is not None
 
 
 @router.post("/generate")
@@ -110,50 +227,31 @@ async def generate_charts(
     batch_dir = OUTPUT_DIR / f"run_{timestamp}"
     batch_dir.mkdir(parents=True, exist_ok=True)
     
-    # 2. 保存数据到 JSON
+    # 2. 保存数据到 JSON (在线程中编码写入，避免阻塞事件循环)
     data_file = batch_dir / "data.json"
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False)
+    await asyncio.to_thread(write_json, data_file, data)
         
     # 3. 更新最新批次目录
     LATEST_BATCH_DIR = batch_dir
+    invalidate_chart_indexes()
     
-    # 4. 调用绘图脚本 (subprocess)
-    # Correct path to plotter.py
-    script_path = ETC_SIM_DIR / "backend" / "plotter.py"
-
-    # 尝试找到 low_numpy 环境的 python
-    # 假设当前是 D:\Anaconda3\python.exe
-    current_python = Path(sys.executable)
-    possible_envs_paths = [
-        # 标准 Anaconda/Miniconda envs 目录
-        current_python.parent / "envs" / "low_numpy" / "python.exe",
-        current_python.parent.parent / "envs" / "low_numpy" / "python.exe",
-        # 常见路径
-        Path("D:/Anaconda3/envs/low_numpy/python.exe"),
-        Path("C:/Anaconda3/envs/low_numpy/python.exe"),
-        Path(os.path.expanduser("~")) / "anaconda3" / "envs" / "low_numpy" / "python.exe",
-        Path(os.path.expanduser("~")) / "miniconda3" / "envs" / "low_numpy" / "python.exe",
-    ]
-    
-    target_python = sys.executable
-    for p in possible_envs_paths:
-        if p.exists():
-            target_python = str(p)
-            print(f"Found specific python env: {target_python}")
-            break
+    # 4. 调用绘图脚本
+    # 尝试找到 low_numpy 环境的 python (仅首次请求探测文件系统)
+    target_python = _resolve_plotter_python()
         
     # 获取主题参数 (默认为 dark)
     theme = data.get("theme", "dark")
-    
-    cmd = [target_python, str(script_path), str(data_file), str(batch_dir), "--theme", theme]
-    
-    # Redirect output to file for debugging
-    log_path = batch_dir / "launcher.log"
-    with open(log_path, "w") as log_file:
-        subprocess.Popen(cmd, stdout=log_file, stderr=log_file)
-    
-    print(f"Launching plotter: {' '.join(cmd)} > {log_path}")
+
+    # 与当前解释器一致时交给常驻绘图进程池，省去解释器与 matplotlib 冷启动
+    future = None
+    if target_python == sys.executable:
+        future = plotter_pool.submit(str(data_file), str(batch_dir), theme)
+
+    if future is not None:
+        future.add_done_callback(partial(_report_plotter_result, batch_dir))
+        logger.info("Submitted plotter batch to pool: %s", batch_dir)
+    else:
+        await _launch_plotter_process(target_python, data_file, batch_dir, theme)
     
     return {
         "status": "processing", 
@@ -163,32 +261,45 @@ async def generate_charts(
     }
 
 
+def _pick_chart(entries: Dict[str, Path], chart_id: str) -> Optional[Path]:
+    """在已刷新的索引中按扩展名优先级查找图表"""
+    for ext in CHART_SUFFIXES:
+        path = entries.get(f"{chart_id}{ext}")
+        if path is not None:
+            return path
+    return None
+
+
 @router.get("")
 async def list_charts():
     """获取所有图表列表"""
+    current_index = _current_index()
+    latest = current_index.refresh()
+    archive = CHARTS_INDEX.refresh() if current_index is not CHARTS_INDEX else {}
+    favorited = FAVORITES_INDEX.refresh()
+
     charts = []
-    current_dir = get_current_charts_dir()
-    
     for chart_id, meta in CHART_METADATA.items():
-        path = get_chart_path(chart_id)
+        path = _pick_chart(latest, chart_id) or _pick_chart(archive, chart_id)
         charts.append({
             "id": chart_id,
             "name": meta["name"],
             "description": meta["description"],
             "available": path is not None,
-            "favorited": is_favorited(chart_id),
+            "favorited": _pick_chart(favorited, chart_id) is not None,
             "url": f"/api/charts/{chart_id}" if path else None,
-            "source": "latest" if path and path.parent == current_dir else "archive"
+            "source": "latest" if path and path.parent == current_index.path else "archive"
         })
-    return {"charts": charts, "batch_source": current_dir.name}
+    return {"charts": charts, "batch_source": current_index.path.name}
 
 
 @router.get("/favorites")
 async def list_favorites():
     """获取收藏列表"""
+    favorited = FAVORITES_INDEX.refresh()
     favorites = []
     for chart_id, meta in CHART_METADATA.items():
-        if is_favorited(chart_id):
+        if _pick_chart(favorited, chart_id) is not None:
             favorites.append({
                 "id": chart_id,
                 "name": meta["name"],
@@ -199,28 +310,24 @@ async def list_favorites():
 
 
 @router.get("/{chart_id}")
-async def get_chart(chart_id: str):
+async def get_chart(chart_id: str, request: Request):
     """获取指定图表图片"""
     path = get_chart_path(chart_id)
     if not path:
         raise HTTPException(status_code=404, detail=f"Chart '{chart_id}' not found")
     
     media_type = "image/gif" if path.suffix == ".gif" else "image/png"
-    return FileResponse(path, media_type=media_type)
+    return file_response(request, path, media_type)
 
 
 @router.get("/{chart_id}/download")
-async def download_chart(chart_id: str):
+async def download_chart(chart_id: str, request: Request):
     """下载图表"""
     path = get_chart_path(chart_id)
     if not path:
         raise HTTPException(status_code=404, detail=f"Chart '{chart_id}' not found")
     
-    return FileResponse(
-        path,
-        media_type="application/octet-stream",
-        filename=path.name
-    )
+    return file_response(request, path, "application/octet-stream", filename=path.name)
 
 
 @router.post("/{chart_id}/favorite")
@@ -231,18 +338,22 @@ async def favorite_chart(chart_id: str):
         raise HTTPException(status_code=404, detail=f"Chart '{chart_id}' not found")
     
     dest = FAVORITES_DIR / path.name
-    shutil.copy2(path, dest)
+    await asyncio.to_thread(_copy_chart, path, dest)
+    invalidate_chart_indexes()
     return {"success": True, "message": f"Chart '{chart_id}' favorited"}
 
 
 @router.delete("/{chart_id}/favorite")
 async def unfavorite_chart(chart_id: str):
     """取消收藏"""
-    for ext in [".png", ".gif"]:
-        fav_path = FAVORITES_DIR / f"{chart_id}{ext}"
-        if fav_path.exists():
+    fav_path = FAVORITES_INDEX.find(chart_id, CHART_SUFFIXES)
+    if fav_path is not None:
+        try:
             fav_path.unlink()
-            return {"success": True, "message": f"Chart '{chart_id}' unfavorited"}
+        except FileNotFoundError:
+            pass
+        invalidate_chart_indexes()
+        return {"success": True, "message": f"Chart '{chart_id}' unfavorited"}
     
     raise HTTPException(status_code=404, detail=f"Chart '{chart_id}' not in favorites")
 
@@ -5,14 +5,22 @@
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-import subprocess
-import tempfile
+from typing import Optional, List, Dict, Any, Sequence, Union
 import os
+import sys
 import json
 import logging
 import asyncio
 import platform
+import shutil
+import hashlib
+import marshal
+import multiprocessing
+import traceback
+from collections import OrderedDict
+from functools import lru_cache
+
+from .. import sandbox_runner
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -20,6 +28,63 @@ logger = logging.getLogger(__name__)
 # 配置
 MAX_EXECUTION_TIME = 30       # 最大执行时间（秒）
 MAX_OUTPUT_LENGTH = 50000     # 最大输出长度（字符）
+_READ_CHUNK_SIZE = 65536      # 子进程输出分块读取大小（字节）
+CONDA_PROBE_TIMEOUT = 2       # conda 路径探测超时（秒）
+
+# 已解析的 conda 可执行文件路径（首次探测后缓存）
+_conda_exe: Optional[str] = None
+
+# 各 conda 环境的 python 解释器路径（解析一次后缓存）: {env_name: python_path}
+_env_python: Dict[str, str] = {}
+
+# 支持的平台上，base 环境代码在 fork-server 派生的子进程中直接 exec（Windows 不可用）。
+# fork-server 是 exec 启动的单线程进程，子进程不会继承服务进程中其他线程持有的锁
+_FORK_CTX = (
+    multiprocessing.get_context("forkserver")
+    if "forkserver" in multiprocessing.get_all_start_methods() else None
+)
+
+if _FORK_CTX is not None:
+    import io
+    from multiprocessing import forkserver, popen_forkserver, reduction, spawn, util
+    from multiprocessing.context import set_spawning_popen
+
+    # spawn.prepare 会在每个子进程中按 init_main_from_path/name 重新执行服务主模块
+    # (uvicorn 控制台脚本约 70-90ms，主模块导入应用时达数秒)；
+    # fork-server 的 "__main__" 预加载在 CPython 中并不生效 (未收到 main_path)，
+    # 因此派生时直接去掉主模块信息，用户代码只依赖预加载的执行入口
+    _MAIN_PREP_KEYS = ("init_main_from_path", "init_main_from_name")
+
+    class _SandboxPopen(popen_forkserver.Popen):
+        """不在子进程中重新执行 __main__ 的 fork-server Popen"""
+
+        def _launch(self, process_obj):
+            prep_data = spawn.get_preparation_data(process_obj._name)
+            for key in _MAIN_PREP_KEYS:
+                prep_data.pop(key, None)
+            buf = io.BytesIO()
+            set_spawning_popen(self)
+            try:
+                reduction.dump(prep_data, buf)
+                reduction.dump(process_obj, buf)
+            finally:
+                set_spawning_popen(None)
+
+            self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+            # 与标准库一致：保留数据管道写端的副本，作为子进程感知父进程存活的哨兵
+            _parent_w = os.dup(w)
+            self.finalizer = util.Finalize(self, util.close_fds, (_parent_w, self.sentinel))
+            with open(w, "wb", closefd=True) as f:
+                f.write(buf.getbuffer())
+            self.pid = forkserver.read_signed(self.sentinel)
+
+    class _SandboxProcess(_FORK_CTX.Process):
+        _Popen = staticmethod(_SandboxPopen)
+
+
+# 已编译用户代码缓存: {blake2b(code): marshal 序列化的 code object}，同一段代码反复评估时跳过编译
+_CODE_CACHE_SIZE = 128
+_code_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
 
 
 # ==================== 请求/响应模型 ====================
@@ -57,9 +122,36 @@ class InstallPackageRequest(BaseModel):
 
 # ==================== 辅助函数 ====================
 
-def _get_conda_exe() -> str:
-    """获取 conda 可执行文件路径"""
-    # Windows 上尝试多种路径
+async def _probe_conda(candidate: str) -> bool:
+    """检查候选路径能否执行 conda --version"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            candidate, "--version",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError:
+        return False
+    try:
+        return await asyncio.wait_for(process.wait(), timeout=CONDA_PROBE_TIMEOUT) == 0
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return False
+
+
+async def _get_conda_exe() -> str:
+    """获取 conda 可执行文件路径（进程内只探测一次）"""
+    global _conda_exe
+    if _conda_exe is not None:
+        return _conda_exe
+
+    # PATH 中可直接找到时无需启动子进程探测
+    if shutil.which("conda"):
+        _conda_exe = "conda"
+        return _conda_exe
+
+    # Windows 上尝试多种路径，并行探测后按候选顺序取第一个可用的
     candidates = [
         "conda",
         os.path.expanduser("~/miniconda3/Scripts/conda.exe"),
@@ -67,19 +159,12 @@ def _get_conda_exe() -> str:
         r"C:\ProgramData\miniconda3\Scripts\conda.exe",
         r"C:\ProgramData\anaconda3\Scripts\conda.exe",
     ]
-    for c in candidates:
-        try:
-            result = subprocess.run(
-                [c, "--version"],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                return c
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            continue
-    return "conda"   # fallback
+    results = await asyncio.gather(*(_probe_conda(c) for c in candidates))
+    _conda_exe = next((c for c, ok in zip(candidates, results) if ok), "conda")
+    return _conda_exe
 
 
+@lru_cache(maxsize=32)
 def _get_conda_activate_cmd(env_name: str) -> str:
     """生成 conda activate 命令前缀"""
     if platform.system() == "Windows":
@@ -87,26 +172,138 @@ def _get_conda_activate_cmd(env_name: str) -> str:
     return f"source activate {env_name} && "
 
 
-async def _run_process(cmd: str, timeout: int = 30, cwd: str = None) -> tuple:
-    """异步运行子进程并捕获输出"""
-    try:
+async def _get_env_python(env_name: str) -> Optional[str]:
+    """解析 conda 环境中 python 解释器的路径，无法解析时返回 None
+
+    base 为 conda 根前缀 (conda info --base，与 list_environments 一致，而不是运行本服务的解释器)；
+    其他环境通过 conda env list 查找前缀目录。结果按环境名缓存。
+    """
+    cached = _env_python.get(env_name)
+    if cached is not None:
+        if os.path.exists(cached):
+            return cached
+        del _env_python[env_name]  # 环境已被删除
+
+    conda = await _get_conda_exe()
+    if env_name == "base":
+        stdout, _, rc = await _run_process(f"{conda} info --base", timeout=15)
+        env_paths = [stdout.strip()] if rc == 0 and stdout.strip() else []
+    else:
+        stdout, _, rc = await _run_process(f"{conda} env list --json", timeout=15)
+        if rc != 0:
+            return None
+        try:
+            env_paths = json.loads(stdout).get("envs", [])
+        except json.JSONDecodeError:
+            return None
+
+    for env_path in env_paths:
+        if env_name != "base" and os.path.basename(env_path) != env_name:
+            continue
         if platform.system() == "Windows":
-            process = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd,
-            )
+            python = os.path.join(env_path, "python.exe")
         else:
-            process = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd,
-            )
-        stdout, stderr = await asyncio.wait_for(
-            process.communicate(), timeout=timeout
+            python = os.path.join(env_path, "bin", "python")
+        if os.path.exists(python):
+            _env_python[env_name] = python
+            return python
+    return None
+
+
+async def _is_server_env(env_name: str) -> bool:
+    """环境是否就是运行本服务的解释器所在前缀，是则可在 fork-server 子进程中执行 (已安装包一致)"""
+    if _FORK_CTX is None:
+        return False
+    python = await _get_env_python(env_name)
+    if python is None:
+        return False
+    try:
+        return os.path.samefile(os.path.dirname(os.path.dirname(python)), sys.prefix)
+    except OSError:
+        return False
+
+
+async def _env_command(env_name: str, *args: str) -> Union[str, List[str]]:
+    """在指定环境中运行 python 的命令
+
+    能解析到解释器路径时返回参数列表（直接 exec，不经 shell）；
+    否则回退为 conda activate 的 shell 命令字符串。
+    """
+    python = await _get_env_python(env_name)
+    if python is not None:
+        return [python, *args]
+    return f"{_get_conda_activate_cmd(env_name)}python {' '.join(args)}"
+
+
+async def _read_capped(stream: asyncio.StreamReader, max_chars: Optional[int]) -> bytes:
+    """分块读取流，最多保留 max_chars 个字符所需的字节，其余读出后丢弃
+
+    UTF-8 单字符最多 4 字节，保留 4 * max_chars + 4 字节即可保证
+    解码后超长的输出仍能被调用方识别并截断。
+    """
+    if max_chars is None:
+        return await stream.read()
+
+    byte_limit = max_chars * 4 + 4
+    buf = bytearray()
+    while True:
+        chunk = await stream.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        room = byte_limit - len(buf)
+        if room > 0:
+            buf += chunk[:room]
+    return bytes(buf)
+
+
+async def _run_process(
+    cmd: Union[str, Sequence[str]],
+    timeout: int = 30,
+    cwd: str = None,
+    max_output: Optional[int] = None,
+    input_data: Optional[bytes] = None,
+) -> tuple:
+    """异步运行子进程并捕获输出
+
+    cmd 为字符串时经 shell 执行（用于 conda activate 等），为参数序列时直接 exec，
+    不经过 shell。
+    max_output 限制 stdout/stderr 各自保留的字符数（None 表示不限制），
+    超出部分在读取时直接丢弃，不会整体缓存在内存中。
+    input_data 不为空时通过 stdin 写入子进程。
+    """
+    try:
+        kwargs = dict(
+            stdin=asyncio.subprocess.PIPE if input_data is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
         )
+        if isinstance(cmd, str):
+            process = await asyncio.create_subprocess_shell(cmd, **kwargs)
+        else:
+            process = await asyncio.create_subprocess_exec(*cmd, **kwargs)
+
+        async def _feed():
+            if input_data is None:
+                return
+            try:
+                process.stdin.write(input_data)
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                process.stdin.close()
+
+        async def _collect():
+            _, out, err = await asyncio.gather(
+                _feed(),
+                _read_capped(process.stdout, max_output),
+                _read_capped(process.stderr, max_output),
+            )
+            await process.wait()
+            return out, err
+
+        stdout, stderr = await asyncio.wait_for(_collect(), timeout=timeout)
         return (
             stdout.decode("utf-8", errors="replace"),
             stderr.decode("utf-8", errors="replace"),
@@ -114,11 +311,85 @@ async def _run_process(cmd: str, timeout: int = 30, cwd: str = None) -> tuple:
         )
     except asyncio.TimeoutError:
         process.kill()
+        await process.wait()
         return "", "执行超时", -1
     except Exception as e:
         return "", str(e), -1
 
 
+def _compile_user_code(code: str) -> bytes:
+    """编译用户代码并以 marshal 序列化 (按代码摘要 LRU 缓存)，无法编译时抛出 SyntaxError/ValueError"""
+    key = hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest()
+    code_bytes = _code_cache.get(key)
+    if code_bytes is not None:
+        _code_cache.move_to_end(key)
+        return code_bytes
+
+    code_bytes = marshal.dumps(compile(code, "<eval>", "exec"))
+    _code_cache[key] = code_bytes
+    if len(_code_cache) > _CODE_CACHE_SIZE:
+        _code_cache.popitem(last=False)
+    return code_bytes
+
+
+def start_fork_server():
+    """启动 fork-server 并预加载执行入口，服务启动时调用 (未调用时在首次执行用户代码时启动)"""
+    if _FORK_CTX is None:
+        return
+    import multiprocessing.forkserver
+
+    _FORK_CTX.set_forkserver_preload([sandbox_runner.__name__])
+    multiprocessing.forkserver.ensure_running()
+
+
+async def _run_forked(
+    code: str,
+    user_globals: dict,
+    timeout: int = 30,
+    max_output: Optional[int] = MAX_OUTPUT_LENGTH,
+    cwd: Optional[str] = None,
+) -> tuple:
+    """在 fork-server 派生的子进程中执行用户代码，返回值与 _run_process 一致
+
+    子进程由已预加载执行入口的 fork-server 派生，省去解释器启动和脚本落盘；
+    user_globals 经 pickle 传入子进程，fd 1/2 的全部输出都会被捕获。
+    max_output 为 None 时不截断输出，cwd 为子进程工作目录。
+    调用方需确认 _FORK_CTX 不为 None。
+    """
+    try:
+        code_bytes = _compile_user_code(code)
+    except (SyntaxError, ValueError):
+        return "", traceback.format_exc(limit=0), 1
+
+    parent_conn, child_conn = _FORK_CTX.Pipe(duplex=False)
+    proc = _SandboxProcess(
+        target=sandbox_runner.run,
+        args=(code_bytes, user_globals, child_conn, max_output, cwd),
+        daemon=True,
+    )
+    try:
+        await asyncio.to_thread(proc.start)
+        child_conn.close()
+        if not await asyncio.to_thread(parent_conn.poll, timeout):
+            proc.kill()
+            await asyncio.to_thread(proc.join)
+            return "", "执行超时", -1
+        try:
+            # 结果可能很大 (max_output 为 None 时不截断)，读取与反序列化放到线程中，不阻塞事件循环
+            return await asyncio.to_thread(parent_conn.recv)
+        except EOFError:
+            # 用户代码直接退出了进程（如 os._exit），没有结果回传
+            await asyncio.to_thread(proc.join)
+            return "", "", proc.exitcode
+    except Exception as e:
+        return "", str(e), -1
+    finally:
+        parent_conn.close()
+        if proc.pid is not None and proc.exitcode is None:
+            # 结果已取回，子进程的退出清理 (数毫秒) 不再阻塞响应，在线程池中回收
+            asyncio.get_running_loop().run_in_executor(None, proc.join)
+
+
 # ==================== 代码执行 ====================
 
 @router.post("/execute", response_model=CodeExecutionResponse)
@@ -127,47 +398,38 @@ async def execute_code(request: CodeExecutionRequest):
     import time
     start_time = time.time()
     
-    # 创建临时脚本文件
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".py", delete=False, encoding="utf-8"
-    ) as f:
-        # 注入预警数据包（作为全局变量 alert_data）
-        if request.alert_data:
-            f.write(f"import json\nalert_data = json.loads('''{json.dumps(request.alert_data, ensure_ascii=False)}''')\n\n")
-        
-        # 添加安全导入限制提示
-        f.write("# === 用户代码 ===\n")
-        f.write(request.code)
-        f.write("\n")
-        
-        script_path = f.name
+    # 组装脚本，通过 stdin 交给 python - 执行，无需落盘临时文件
+    parts = []
+    # 注入预警数据包（作为全局变量 alert_data）
+    if request.alert_data:
+        parts.append(f"import json\nalert_data = json.loads('''{json.dumps(request.alert_data, ensure_ascii=False)}''')\n\n")
 
-    try:
-        # 构建执行命令
-        timeout = min(request.timeout, MAX_EXECUTION_TIME)
-        activate = _get_conda_activate_cmd(request.environment)
-        cmd = f'{activate}python "{script_path}"'
+    # 添加安全导入限制提示
+    parts.append("# === 用户代码 ===\n")
+    parts.append(request.code)
+    parts.append("\n")
+    script = "".join(parts).encode("utf-8")
 
-        stdout, stderr, returncode = await _run_process(cmd, timeout=timeout)
+    # 构建执行命令
+    timeout = min(request.timeout, MAX_EXECUTION_TIME)
+    cmd = await _env_command(request.environment, "-")
 
-        # 截断过长输出
-        if len(stdout) > MAX_OUTPUT_LENGTH:
-            stdout = stdout[:MAX_OUTPUT_LENGTH] + f"\n... [输出已截断，超出 {MAX_OUTPUT_LENGTH} 字符]"
+    stdout, stderr, returncode = await _run_process(
+        cmd, timeout=timeout, max_output=MAX_OUTPUT_LENGTH, input_data=script
+    )
 
-        elapsed = time.time() - start_time
+    # 截断过长输出
+    if len(stdout) > MAX_OUTPUT_LENGTH:
+        stdout = stdout[:MAX_OUTPUT_LENGTH] + f"\n... [输出已截断，超出 {MAX_OUTPUT_LENGTH} 字符]"
 
-        return CodeExecutionResponse(
-            success=(returncode == 0),
-            output=stdout,
-            error=stderr if returncode != 0 else "",
-            execution_time=round(elapsed, 3),
-        )
-    finally:
-        # 清理临时文件
-        try:
-            os.unlink(script_path)
-        except OSError:
-            pass
+    elapsed = time.time() - start_time
+
+    return CodeExecutionResponse(
+        success=(returncode == 0),
+        output=stdout,
+        error=stderr if returncode != 0 else "",
+        execution_time=round(elapsed, 3),
+    )
 
 
 # ==================== 虚拟环境管理 ====================
@@ -175,7 +437,7 @@ async def execute_code(request: CodeExecutionRequest):
 @router.get("/environments", response_model=List[EnvironmentInfo])
 async def list_environments():
     """列出所有可用的 conda 环境"""
-    conda = _get_conda_exe()
+    conda = await _get_conda_exe()
     
     try:
         stdout, stderr, rc = await _run_process(
@@ -198,14 +460,14 @@ async def list_environments():
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="无法解析 conda 输出")
     except Exception as e:
-        logger.error(f"列出环境失败: {e}")
+        logger.error("列出环境失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/environments", response_model=Dict[str, Any])
 async def create_environment(request: CreateEnvironmentRequest):
     """创建新的 conda 环境"""
-    conda = _get_conda_exe()
+    conda = await _get_conda_exe()
     
     # 基本命令
     cmd = f'{conda} create -n {request.name} python={request.python_version} -y'
@@ -217,13 +479,11 @@ async def create_environment(request: CreateEnvironmentRequest):
     
     # 如果有额外包需要安装
     if request.packages:
-        pkgs = " ".join(request.packages)
-        activate = _get_conda_activate_cmd(request.name)
-        install_cmd = f"{activate}pip install {pkgs}"
+        install_cmd = await _env_command(request.name, "-m", "pip", "install", *request.packages)
         
         stdout2, stderr2, rc2 = await _run_process(install_cmd, timeout=180)
         if rc2 != 0:
-            logger.warning(f"部分包安装失败: {stderr2}")
+            logger.warning("部分包安装失败: %s", stderr2)
     
     return {
         "success": True,
@@ -238,7 +498,7 @@ async def delete_environment(name: str):
     if name.lower() == "base":
         raise HTTPException(status_code=400, detail="不能删除 base 环境")
     
-    conda = _get_conda_exe()
+    conda = await _get_conda_exe()
     cmd = f"{conda} env remove -n {name} -y"
     
     stdout, stderr, rc = await _run_process(cmd, timeout=60)
@@ -252,11 +512,9 @@ async def delete_environment(name: str):
 @router.post("/packages/install", response_model=Dict[str, Any])
 async def install_packages(request: InstallPackageRequest):
     """在指定环境中安装 pip 包"""
-    activate = _get_conda_activate_cmd(request.environment)
-    pkgs = " ".join(request.packages)
-    cmd = f"{activate}pip install {pkgs}"
+    cmd = await _env_command(request.environment, "-m", "pip", "install", *request.packages)
     
-    stdout, stderr, rc = await _run_process(cmd, timeout=180)
+    stdout, stderr, rc = await _run_process(cmd, timeout=180, max_output=5000)
     
     return {
         "success": rc == 0,
@@ -268,8 +526,7 @@ async def install_packages(request: InstallPackageRequest):
 @router.get("/environments/{name}/packages")
 async def list_packages(name: str):
     """列出指定环境中已安装的 pip 包"""
-    activate = _get_conda_activate_cmd(name)
-    cmd = f"{activate}pip list --format json"
+    cmd = await _env_command(name, "-m", "pip", "list", "--format", "json")
     
     stdout, stderr, rc = await _run_process(cmd, timeout=15)
     
@@ -4,7 +4,7 @@
 
 from fastapi import APIRouter, HTTPException, status
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 
 from etc_sim.backend.models.schemas import (
@@ -16,51 +16,47 @@ from etc_sim.backend.models.schemas import (
 router = APIRouter()
 
 # 内存存储 (生产环境应使用数据库)
+# 记录直接按 ConfigResponse 的字段形态保存，读路由无需再逐条重建载荷；
+# 路由内读写之间没有 await，变更在事件循环上天然是原子的
 _configs_db: dict = {}
 
 
+def _make_record(config_id: str, name: str, description: Optional[str],
+                 config: dict, created_at: datetime, updated_at: datetime) -> dict:
+    """构造与响应模型同形的存储记录"""
+    return {
+        "id": config_id,
+        "name": name,
+        "description": description,
+        "config": config,
+        "created_at": created_at,
+        "updated_at": updated_at
+    }
+
+
 @router.get("", response_model=List[ConfigResponse])
-async def list_configs() -> List[ConfigResponse]:
+async def list_configs() -> List[dict]:
     """获取所有配置"""
-    configs = []
-    for cid, config in _configs_db.items():
-        configs.append(ConfigResponse(
-            id=cid,
-            name=config["name"],
-            description=config.get("description"),
-            config=config["config"],
-            created_at=config["created_at"],
-            updated_at=config["updated_at"]
-        ))
-    return configs
+    return list(_configs_db.values())
 
 
 @router.post("", response_model=ConfigResponse, status_code=status.HTTP_201_CREATED)
-async def create_config(request: ConfigCreateRequest) -> ConfigResponse:
+async def create_config(request: ConfigCreateRequest) -> dict:
     """创建新配置"""
     config_id = str(uuid.uuid4())
-    now = datetime.utcnow()
-    
-    _configs_db[config_id] = {
-        "name": request.name,
-        "description": request.description,
-        "config": request.config.to_dict(),
-        "created_at": now,
-        "updated_at": now
-    }
+    now = datetime.now(timezone.utc)
     
-    return ConfigResponse(
-        id=config_id,
-        name=request.name,
-        description=request.description,
-        config=request.config.to_dict(),
-        created_at=now,
-        updated_at=now
+    record = _make_record(
+        config_id, request.name, request.description,
+        request.config.to_dict(), now, now
     )
+    _configs_db[config_id] = record
+    
+    return record
 
 
 @router.get("/{config_id}", response_model=ConfigResponse)
-async def get_config(config_id: str) -> ConfigResponse:
+async def get_config(config_id: str) -> dict:
     """获取配置详情"""
     if config_id not in _configs_db:
         raise HTTPException(
@@ -68,22 +64,14 @@ async def get_config(config_id: str) -> ConfigResponse:
             detail=f"配置 {config_id} 不存在"
         )
     
-    config = _configs_db[config_id]
-    return ConfigResponse(
-        id=config_id,
-        name=config["name"],
-        description=config.get("description"),
-        config=config["config"],
-        created_at=config["created_at"],
-        updated_at=config["updated_at"]
-    )
+    return _configs_db[config_id]
 
 
 @router.put("/{config_id}", response_model=ConfigResponse)
 async def update_config(
     config_id: str,
     request: ConfigCreateRequest
-) -> ConfigResponse:
+) -> dict:
     """更新配置"""
     if config_id not in _configs_db:
         raise HTTPException(
@@ -95,18 +83,10 @@ async def update_config(
         "name": request.name,
         "description": request.description,
         "config": request.config.to_dict(),
-        "updated_at": datetime.utcnow()
+        "updated_at": datetime.now(timezone.utc)
     })
     
-    config = _configs_db[config_id]
-    return ConfigResponse(
-        id=config_id,
-        name=config["name"],
-        description=config.get("description"),
-        config=config["config"],
-        created_at=config["created_at"],
-        updated_at=config["updated_at"]
-    )
+    return _configs_db[config_id]
 
 
 @router.delete("/{config_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -122,7 +102,7 @@ async def delete_config(config_id: str):
 
 
 @router.post("/{config_id}/duplicate", response_model=ConfigResponse)
-async def duplicate_config(config_id: str) -> ConfigResponse:
+async def duplicate_config(config_id: str) -> dict:
     """复制配置"""
     if config_id not in _configs_db:
         raise HTTPException(
@@ -132,21 +112,12 @@ async def duplicate_config(config_id: str) -> ConfigResponse:
     
     original = _configs_db[config_id]
     new_id = str(uuid.uuid4())
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     
-    _configs_db[new_id] = {
-        "name": f"{original['name']} (副本)",
-        "description": original.get("description"),
-        "config": original["config"],
-        "created_at": now,
-        "updated_at": now
-    }
-    
-    return ConfigResponse(
-        id=new_id,
-        name=_configs_db[new_id]["name"],
-        description=_configs_db[new_id].get("description"),
-        config=_configs_db[new_id]["config"],
-        created_at=now,
-        updated_at=now
+    record = _make_record(
+        new_id, f"{original['name']} (副本)", original.get("description"),
+        original["config"], now, now
     )
+    _configs_db[new_id] = record
+    
+    return record
@@ -4,14 +4,25 @@
 """
 
 import os
-import json
+import re
+import asyncio
 import logging
+import tempfile
+from collections import OrderedDict
 from enum import Enum
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request
 from pydantic import BaseModel
 from pathlib import Path
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from ..services.file_response import file_response
+from ..services.json_io import json_response, read_json
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -31,6 +42,94 @@ if not BASE_DIR.exists():
     except Exception as e:
         logger.error(f"Failed to create directory {BASE_DIR}: {e}")
 
+# 合法的路径文件名：单层文件名，不含路径分隔符、Windows 保留字符和控制字符，
+# 不以 "." 开头（排除 "."、".." 与隐藏文件）
+_SAFE_NAME = re.compile(r'(?!\.)[^\\/:*?"<>|\x00-\x1f]{1,128}')
+
+
+def _road_path(filename: str) -> Path:
+    """校验文件名并返回其在 BASE_DIR 下的路径，非法文件名返回 400"""
+    if not _SAFE_NAME.fullmatch(filename):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    return BASE_DIR / filename
+
+
+# 路径文件摘要缓存: {path: (mtime_ns, size, total_length_km, num_gantries)}
+# 文件未变化时跳过整文件 JSON 解析，超过上限时按插入顺序淘汰
+_META_CACHE_SIZE = 1024
+_meta_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+# 数组元素开始的事件 (map_key/end_* 与元素同前缀，不计数)
+_ITEM_START_EVENTS = frozenset({"start_map", "start_array", "string", "number", "boolean", "null"})
+
+
+def _stream_road_meta(f) -> tuple:
+    """流式提取 meta.total_length_km 与 gantries 数量，不构建 nodes/edges 对象"""
+    total_length_km = None
+    num_gantries = 0
+    meta_done = gantries_done = False
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix == "meta.total_length_km" and event in ("number", "string"):
+            total_length_km = value
+        elif prefix == "gantries.item" and event in _ITEM_START_EVENTS:
+            num_gantries += 1
+        elif prefix == "meta" and event == "end_map":
+            meta_done = True
+        elif prefix == "gantries" and event == "end_array":
+            gantries_done = True
+        if meta_done and gantries_done:
+            break
+    return total_length_km, num_gantries
+
+
+def _read_road_meta(file_path: str, stat: os.stat_result) -> tuple:
+    """读取路径长度和门架数 (按 mtime/size 缓存)"""
+    key = file_path
+    cached = _meta_cache.get(key)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2], cached[3]
+
+    total_length_km = None
+    num_gantries = None
+    try:
+        if ijson is not None:
+            with open(file_path, "rb") as f:
+                total_length_km, num_gantries = _stream_road_meta(f)
+        else:
+            road_data = read_json(file_path)
+            meta = road_data.get("meta", {})
+            total_length_km = meta.get("total_length_km")
+            num_gantries = len(road_data.get("gantries", []))
+    except Exception:
+        total_length_km = num_gantries = None  # 读取失败时保持 None
+
+    _meta_cache[key] = (stat.st_mtime_ns, stat.st_size, total_length_km, num_gantries)
+    _meta_cache.move_to_end(key)
+    while len(_meta_cache) > _META_CACHE_SIZE:
+        _meta_cache.popitem(last=False)
+    return total_length_km, num_gantries
+
+
+def _write_road_file(file_path: Path, data: "CustomRoadData") -> os.stat_result:
+    """序列化并原子写入路径文件 (先写同目录临时文件再 os.replace)，返回写入后的 stat"""
+    # Pydantic v2 直接由模型序列化为 JSON，不经过中间 dict
+    content = data.model_dump_json(indent=2).encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认 0600
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return os.stat(file_path)
+
+
 class CustomRoadType(str, Enum):
     PATH = "path"
 
@@ -64,54 +163,43 @@ class CustomRoadFile(BaseModel):
 @router.get("/", response_model=List[CustomRoadFile])
 async def list_custom_roads():
     """获取所有自定义路径文件列表"""
-    if not BASE_DIR.exists():
-        return []
+    try:
+        with os.scandir(BASE_DIR) as it:
+            entries = [e for e in it if e.name.endswith(".json")]
+    except FileNotFoundError:
+        return json_response([])
     
+    # 直接构建 dict 列表并序列化，跳过逐项 Pydantic 校验
     files = []
-    for file_path in BASE_DIR.glob("*.json"):
+    for entry in entries:
         try:
-            stat = file_path.stat()
+            stat = entry.stat()
             # 尝试读取路径长度和门架数
-            total_length_km = None
-            num_gantries = None
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    road_data = json.load(f)
-                meta = road_data.get("meta", {})
-                total_length_km = meta.get("total_length_km")
-                num_gantries = len(road_data.get("gantries", []))
-            except Exception:
-                pass  # 读取失败时保持 None
+            total_length_km, num_gantries = _read_road_meta(entry.path, stat)
             
-            files.append(CustomRoadFile(
-                filename=file_path.name,
-                updated_at=stat.st_mtime,
-                size=stat.st_size,
-                total_length_km=total_length_km,
-                num_gantries=num_gantries,
-            ))
+            files.append({
+                "filename": entry.name,
+                "updated_at": stat.st_mtime,
+                "size": stat.st_size,
+                "total_length_km": total_length_km,
+                "num_gantries": num_gantries,
+            })
         except Exception as e:
-            logger.error(f"Error reading file {file_path}: {e}")
+            logger.error(f"Error reading file {entry.path}: {e}")
             continue
             
     # 按修改时间倒序排列
-    files.sort(key=lambda x: x.updated_at, reverse=True)
-    return files
+    files.sort(key=lambda x: x["updated_at"], reverse=True)
+    return json_response(files)
 
 @router.get("/{filename}", response_model=CustomRoadData)
-async def get_custom_road(filename: str):
-    """获取指定路径文件的详细内容"""
-    file_path = BASE_DIR / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
+async def get_custom_road(filename: str, request: Request):
+    """获取指定路径文件的详细内容 (直接发送文件，不做 JSON 解析/再序列化)"""
+    file_path = _road_path(filename)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        logger.error(f"Error reading json {filename}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
+        return file_response(request, file_path, "application/json", max_age=60)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
 
 @router.post("/", response_model=CustomRoadFile)
 async def save_custom_road(
@@ -124,13 +212,10 @@ async def save_custom_road(
     if not clean_filename.endswith(".json"):
         clean_filename += ".json"
         
-    file_path = BASE_DIR / clean_filename
+    file_path = _road_path(clean_filename)
     
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data.dict(), f, indent=2, ensure_ascii=False)
-            
-        stat = file_path.stat()
+        stat = await asyncio.to_thread(_write_road_file, file_path, data)
         return CustomRoadFile(
             filename=clean_filename,
             updated_at=stat.st_mtime,
@@ -143,7 +228,7 @@ async def save_custom_road(
 @router.put("/{filename}")
 async def rename_custom_road(filename: str, new_filename: str = Body(..., embed=True)):
     """重命名文件"""
-    old_path = BASE_DIR / filename
+    old_path = _road_path(filename)
     if not old_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
         
@@ -151,7 +236,7 @@ async def rename_custom_road(filename: str, new_filename: str = Body(..., embed=
     if not clean_new_name.endswith(".json"):
         clean_new_name += ".json"
         
-    new_path = BASE_DIR / clean_new_name
+    new_path = _road_path(clean_new_name)
     if new_path.exists():
         raise HTTPException(status_code=400, detail="Target filename already exists")
         
@@ -164,7 +249,7 @@ async def rename_custom_road(filename: str, new_filename: str = Body(..., embed=
 @router.delete("/{filename}")
 async def delete_custom_road(filename: str):
     """删除文件"""
-    file_path = BASE_DIR / filename
+    file_path = _road_path(filename)
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
         
@@ -3,21 +3,32 @@
 提供数据包的 CRUD 操作和基于用户代码的评判功能。
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
-import json
-import glob
+import asyncio
 import logging
+from collections import Counter
+
+from ..services.json_io import dumps as json_dumps, is_strict_json, json_response, loads as json_loads, read_json
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# 数据包存储目录
-PACKETS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'packets')
+# 数据包存储目录（导入时规范化为绝对路径，后续拼接的路径不含 ".." 段）
+PACKETS_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'packets'))
 os.makedirs(PACKETS_DIR, exist_ok=True)
 
+# 数据包摘要缓存: {filepath: (mtime_ns, size, summary)}
+_summary_cache: Dict[str, tuple] = {}
+
+# 数据包文件能否原样拼接进响应的缓存: {filepath: (mtime_ns, size, is_strict_json)}
+_raw_valid_cache: Dict[str, tuple] = {}
+
+# 列表时并发解析数据包文件的上限
+_PARSE_CONCURRENCY = 32
+
 
 class PacketSummary(BaseModel):
     packet_id: str
@@ -43,39 +54,110 @@ def _load_packet(packet_id: str) -> dict:
     filepath = os.path.join(PACKETS_DIR, f"packet_{packet_id}.json")
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail=f"数据包 {packet_id} 不存在")
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_json(filepath)
+
+
+def _summarize(filepath: str) -> dict:
+    """读取数据包并生成摘要"""
+    data = read_json(filepath)
+
+    alerts = data.get('alerts', [])
+    severity_counts = dict(Counter(a.get('severity', 'medium') for a in alerts))
+
+    return {
+        'packet_id': data.get('packet_id', ''),
+        'session_id': data.get('session_id', ''),
+        'created_at': data.get('created_at', ''),
+        'duration_s': data.get('duration_s', 0),
+        'alert_count': len(alerts),
+        'truth_count': len(data.get('ground_truths', [])),
+        'severity_counts': severity_counts,
+        'avg_speed_kmh': data.get('snapshot', {}).get('avg_speed_kmh', 0),
+        'weather': data.get('snapshot', {}).get('weather', 'clear'),
+    }
+
 
+def _read_packet_body(filepath: str) -> bytes:
+    """读取数据包并生成 get_packet 的响应体
 
-def _list_all_packets() -> List[dict]:
-    """列出所有数据包摘要"""
-    pattern = os.path.join(PACKETS_DIR, "packet_*.json")
-    summaries = []
-    for filepath in sorted(glob.glob(pattern), reverse=True):
+    文件为严格合法的 JSON 时直接拼接进响应体，避免解析后再序列化一遍；
+    AlertDataPacket.to_json 可能写出 NaN 等非法字面量，此时解析后重新序列化 (NaN 输出为 null)。
+    校验结果按文件 mtime/size 缓存。
+    """
+    with open(filepath, "rb") as f:
+        st = os.fstat(f.fileno())
+        raw = f.read()
+
+    cached = _raw_valid_cache.get(filepath)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        valid = cached[2]
+    else:
+        valid = is_strict_json(raw)
+        _raw_valid_cache[filepath] = (st.st_mtime_ns, st.st_size, valid)
+
+    if valid:
+        return b'{"success":true,"data":' + raw + b'}'
+    return json_dumps({"success": True, "data": json_loads(raw)})
+
+
+def _scan_packets() -> List[tuple]:
+    """单次 scandir 列出数据包文件及其 stat，排序与原先一致 (文件名倒序)"""
+    with os.scandir(PACKETS_DIR) as it:
+        entries = [
+            e for e in it
+            if e.name.startswith("packet_") and e.name.endswith(".json")
+        ]
+    entries.sort(key=lambda e: e.name, reverse=True)
+
+    result = []
+    for entry in entries:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            alerts = data.get('alerts', [])
-            severity_counts = {}
-            for a in alerts:
-                sev = a.get('severity', 'medium')
-                severity_counts[sev] = severity_counts.get(sev, 0) + 1
-            
-            summaries.append({
-                'packet_id': data.get('packet_id', ''),
-                'session_id': data.get('session_id', ''),
-                'created_at': data.get('created_at', ''),
-                'duration_s': data.get('duration_s', 0),
-                'alert_count': len(alerts),
-                'truth_count': len(data.get('ground_truths', [])),
-                'severity_counts': severity_counts,
-                'avg_speed_kmh': data.get('snapshot', {}).get('avg_speed_kmh', 0),
-                'weather': data.get('snapshot', {}).get('weather', 'clear'),
-            })
-        except Exception as e:
-            logger.warning(f"读取数据包失败 {filepath}: {e}")
-    return summaries
+            result.append((entry.path, entry.stat()))
+        except OSError:
+            continue  # 扫描期间被删除
+    return result
+
+
+async def _list_all_packets() -> List[dict]:
+    """列出所有数据包摘要
+
+    文件 mtime/size 未变化时复用缓存的摘要；其余文件在线程池中并发解析，
+    同时进行的读取数不超过 _PARSE_CONCURRENCY。
+    """
+    files = await asyncio.to_thread(_scan_packets)
+
+    summaries: List[Optional[dict]] = [None] * len(files)
+    pending = []
+    for i, (filepath, stat) in enumerate(files):
+        cached = _summary_cache.get(filepath)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            summaries[i] = cached[2]
+        else:
+            pending.append(i)
+
+    if pending:
+        sem = asyncio.Semaphore(_PARSE_CONCURRENCY)
+
+        async def _parse(i: int):
+            filepath, stat = files[i]
+            async with sem:
+                try:
+                    summary = await asyncio.to_thread(_summarize, filepath)
+                except Exception as e:
+                    _summary_cache.pop(filepath, None)
+                    logger.warning(f"读取数据包失败 {filepath}: {e}")
+                    return
+            _summary_cache[filepath] = (stat.st_mtime_ns, stat.st_size, summary)
+            summaries[i] = summary
+
+        await asyncio.gather(*(_parse(i) for i in pending))
+
+    # 清理已不存在文件的缓存项
+    live = {path for path, _ in files}
+    for cache in (_summary_cache, _raw_valid_cache):
+        for path in [p for p in cache if p not in live]:
+            del cache[path]
+    return [s for s in summaries if s is not None]
 
 
 # ==================== API ====================
@@ -83,14 +165,18 @@ def _list_all_packets() -> List[dict]:
 @router.get("/", response_model=List[PacketSummary])
 async def list_packets():
     """列出所有预警数据包摘要"""
-    return _list_all_packets()
+    return json_response(await _list_all_packets())
 
 
 @router.get("/{packet_id}")
 async def get_packet(packet_id: str):
     """获取指定数据包完整内容"""
-    data = _load_packet(packet_id)
-    return {"success": True, "data": data}
+    filepath = os.path.join(PACKETS_DIR, f"packet_{packet_id}.json")
+    try:
+        body = await asyncio.to_thread(_read_packet_body, filepath)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"数据包 {packet_id} 不存在")
+    return Response(content=body, media_type="application/json")
 
 
 @router.delete("/{packet_id}")
@@ -100,6 +186,8 @@ async def delete_packet(packet_id: str):
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail=f"数据包 {packet_id} 不存在")
     os.remove(filepath)
+    _summary_cache.pop(filepath, None)
+    _raw_valid_cache.pop(filepath, None)
     return {"success": True, "message": f"数据包 {packet_id} 已删除"}
 
 
@@ -113,42 +201,45 @@ async def evaluate_packet_with_code(packet_id: str, request: EvaluateWithCodeReq
     packet_data = _load_packet(packet_id)
     
     # 复用 code_execution 模块的执行逻辑
-    from .code_execution import _get_conda_activate_cmd, _run_process, MAX_OUTPUT_LENGTH
-    import tempfile
+    from .code_execution import (
+        _env_command, _is_server_env, _run_forked, _run_process, MAX_OUTPUT_LENGTH,
+    )
     import time
 
     start_time = time.time()
 
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".py", delete=False, encoding="utf-8"
-    ) as f:
-        f.write(f"import json\nalert_data = json.loads('''{json.dumps(packet_data, ensure_ascii=False)}''')\n\n")
-        f.write("# === 用户评估代码 ===\n")
-        f.write(request.code)
-        f.write("\n")
-        script_path = f.name
-
-    try:
-        activate = _get_conda_activate_cmd(request.environment)
-        cmd = f'{activate}python "{script_path}"'
-        stdout, stderr, rc = await _run_process(cmd, timeout=30)
+    if await _is_server_env(request.environment):
+        # 所选环境即服务自身的解释器 (如服务运行在 conda 根环境中时的 base)：
+        # 在 fork-server 派生的子进程中直接 exec，省去解释器启动与数据包 JSON 字面量的解析；
+        # 其他环境与 execute_code 一致，使用该环境的解释器执行。
+        # 全局变量需经 pickle 传给子进程，json 模块改由代码自行导入
+        user_globals = {"__name__": "__main__", "alert_data": packet_data}
+        stdout, stderr, rc = await _run_forked("import json\n" + request.code, user_globals, timeout=30)
+    else:
+        # 与 execute_code 一致：脚本经 stdin 交给 python - 执行，无需落盘临时文件
+        # repr() 生成合法的 Python 字符串字面量，JSON 中的反斜杠转义不会被改写
+        packet_literal = repr(json_dumps(packet_data).decode("utf-8"))
+        script = (
+            f"import json\nalert_data = json.loads({packet_literal})\n\n"
+            "# === 用户评估代码 ===\n"
+            f"{request.code}\n"
+        ).encode("utf-8")
+        cmd = await _env_command(request.environment, "-")
+        stdout, stderr, rc = await _run_process(
+            cmd, timeout=30, max_output=MAX_OUTPUT_LENGTH, input_data=script
+        )
 
-        if len(stdout) > MAX_OUTPUT_LENGTH:
-            stdout = stdout[:MAX_OUTPUT_LENGTH] + "\n... [已截断]"
+    if len(stdout) > MAX_OUTPUT_LENGTH:
+        stdout = stdout[:MAX_OUTPUT_LENGTH] + "\n... [已截断]"
 
-        elapsed = time.time() - start_time
+    elapsed = time.time() - start_time
 
-        return {
-            "success": rc == 0,
-            "output": stdout,
-            "error": stderr if rc != 0 else "",
-            "execution_time": round(elapsed, 3),
-        }
-    finally:
-        try:
-            os.unlink(script_path)
-        except OSError:
-            pass
+    return {
+        "success": rc == 0,
+        "output": stdout,
+        "error": stderr if rc != 0 else "",
+        "execution_time": round(elapsed, 3),
+    }
 
 
 @router.post("/store")
@@ -159,6 +250,8 @@ async def store_packet(data: Dict[str, Any]):
     try:
         packet = AlertDataPacket.from_dict(data)
         filepath = packet.save(PACKETS_DIR)
+        _summary_cache.pop(filepath, None)
+        _raw_valid_cache.pop(filepath, None)
         return {
             "success": True,
             "packet_id": packet.packet_id,
@@ -3,11 +3,14 @@
 提供天气系统和道路坡度的配置接口
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from enum import Enum
 
+from etc_sim.models.environment import GradientTable
+from ..services.json_io import dumps as json_dumps, json_response
+
 
 router = APIRouter()
 
@@ -82,25 +85,57 @@ WEATHER_PRESETS = {
     }
 }
 
+# 天气类型列表在进程生命周期内不变，导入时序列化一次
+_WEATHER_TYPES_JSON = json_dumps([
+    {
+        "type": wt.value,
+        "name": WEATHER_PRESETS[wt]["name"],
+        "description": WEATHER_PRESETS[wt]["description"],
+        "speed_factor": WEATHER_PRESETS[wt]["speed_factor"],
+        "headway_factor": WEATHER_PRESETS[wt]["headway_factor"]
+    }
+    for wt in WeatherType
+])
+
+# 各天气类型对应的状态字段，仅 enabled/gradient_segments 需按请求填充
+_STATUS_PRESETS = {
+    wt: {
+        "weather_type": wt.value,
+        "weather_name": WEATHER_PRESETS[wt]["name"],
+        "weather_description": WEATHER_PRESETS[wt]["description"],
+        "speed_factor": WEATHER_PRESETS[wt]["speed_factor"],
+        "headway_factor": WEATHER_PRESETS[wt]["headway_factor"],
+        "visibility_factor": WEATHER_PRESETS[wt]["visibility_factor"],
+    }
+    for wt in WeatherType
+}
+
 # 内存存储当前配置
 _current_config = EnvironmentConfig()
 
+# 坡度分段的列式索引，配置变更后重建；gradient_segments 列表仅用于序列化
+_gradient_table = GradientTable()
+
+
+def _rebuild_gradient_table():
+    global _gradient_table
+    _gradient_table = GradientTable(_current_config.gradient_segments)
+
+
+def get_gradient_at(position_km: float) -> float:
+    """查询当前配置下指定位置的坡度百分比"""
+    return _gradient_table.lookup(position_km)
+
 
 @router.get("", response_model=EnvironmentStatus)
-async def get_environment_status() -> EnvironmentStatus:
+async def get_environment_status() -> Response:
     """获取当前环境配置状态"""
-    preset = WEATHER_PRESETS.get(_current_config.weather_type, WEATHER_PRESETS[WeatherType.CLEAR])
-    
-    return EnvironmentStatus(
-        enabled=_current_config.enabled,
-        weather_type=_current_config.weather_type.value,
-        weather_name=preset["name"],
-        weather_description=preset["description"],
-        speed_factor=preset["speed_factor"],
-        headway_factor=preset["headway_factor"],
-        visibility_factor=preset["visibility_factor"],
-        gradient_segments=len(_current_config.gradient_segments)
-    )
+    preset = _STATUS_PRESETS.get(_current_config.weather_type, _STATUS_PRESETS[WeatherType.CLEAR])
+    return json_response({
+        "enabled": _current_config.enabled,
+        **preset,
+        "gradient_segments": len(_current_config.gradient_segments)
+    })
 
 
 @router.put("", response_model=EnvironmentConfig)
@@ -108,22 +143,14 @@ async def update_environment(config: EnvironmentConfig) -> EnvironmentConfig:
     """更新环境配置"""
     global _current_config
     _current_config = config
+    _rebuild_gradient_table()
     return _current_config
 
 
-@router.get("/weather-types")
-async def get_weather_types() -> List[dict]:
+@router.get("/weather-types", response_model=List[dict])
+async def get_weather_types() -> Response:
     """获取所有可用天气类型"""
-    return [
-        {
-            "type": wt.value,
-            "name": WEATHER_PRESETS[wt]["name"],
-            "description": WEATHER_PRESETS[wt]["description"],
-            "speed_factor": WEATHER_PRESETS[wt]["speed_factor"],
-            "headway_factor": WEATHER_PRESETS[wt]["headway_factor"]
-        }
-        for wt in WeatherType
-    ]
+    return Response(content=_WEATHER_TYPES_JSON, media_type="application/json")
 
 
 @router.post("/gradients", response_model=EnvironmentConfig)
@@ -131,6 +158,7 @@ async def add_gradient_segment(segment: GradientSegment) -> EnvironmentConfig:
     """添加坡度分段"""
     global _current_config
     _current_config.gradient_segments.append(segment)
+    _rebuild_gradient_table()
     return _current_config
 
 
@@ -139,4 +167,5 @@ async def clear_gradient_segments() -> EnvironmentConfig:
     """清除所有坡度分段"""
     global _current_config
     _current_config.gradient_segments = []
+    _rebuild_gradient_table()
     return _current_config
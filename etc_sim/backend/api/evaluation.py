@@ -3,13 +3,16 @@
 提供仿真后评估指标查询、优化建议等端点
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from functools import lru_cache
+import copy
 import logging
 
 from etc_sim.models.alert_evaluator import (
-    AlertEvaluator, GroundTruthEvent, EvaluationMetrics,
+    AlertEvaluator, AlertTimeIndex, GroundTruthEvent, EvaluationMetrics,
     extract_ground_truths_from_engine, extract_alert_events_from_engine,
     compute_gantry_stats,
 )
@@ -17,6 +20,7 @@ from etc_sim.models.alert_optimizer import (
     AlertOptimizer, suggest_param_ranges, ParamRange
 )
 from etc_sim.models.alert_rules import AlertRuleEngine, create_default_rules
+from ..services.json_io import dumps as json_dumps, json_response, scan_json
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -26,6 +30,56 @@ _last_evaluation: Optional[Dict[str, Any]] = None
 _last_ground_truths: List[GroundTruthEvent] = []
 _last_alert_events: list = []
 
+# 敏感性分析结果缓存: {(参数名, 参数值): (f1, precision, recall)}
+# 真值/预警数据被替换时清空
+_SENS_CACHE_SIZE = 1024
+_sens_cache: Dict[tuple, tuple] = {}
+
+# 规则优化结果缓存: {(规则名, 条件序号, 参数范围): [结果字典, ...]}
+# 同样在真值数据被替换时清空
+_OPTIMIZE_CACHE_SIZE = 64
+_optimize_cache: Dict[tuple, list] = {}
+
+
+# 文件评估结果缓存 (LRU): {(文件路径, mtime_ns, size, 时间窗, 距离窗): (响应体, 真值列表)}
+# 结果还依赖当前的预警事件，预警数据被替换时清空
+_FILE_EVAL_CACHE_SIZE = 16
+_file_eval_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+# 最近一批预警的时间索引: (预警列表, AlertTimeIndex)
+# 按列表对象身份校验，_last_alert_events 被整体替换后自动重建
+_alert_index_cache: Optional[tuple] = None
+
+
+def _last_alert_index() -> AlertTimeIndex:
+    """获取 _last_alert_events 的时间索引，各评估端点共享同一份"""
+    global _alert_index_cache
+    if _alert_index_cache is None or _alert_index_cache[0] is not _last_alert_events:
+        _alert_index_cache = (_last_alert_events, AlertTimeIndex(_last_alert_events))
+    return _alert_index_cache[1]
+
+
+def _clear_result_caches():
+    """真值/预警数据被替换后清空依赖它们的结果缓存"""
+    _sens_cache.clear()
+    _optimize_cache.clear()
+
+
+# 无评估数据时的摘要响应体 (固定内容，预先序列化)
+_EMPTY_SUMMARY_JSON = json_dumps({
+    "success": True,
+    "data": {
+        "precision": 0,
+        "recall": 0,
+        "f1_score": 0,
+        "total_ground_truths": 0,
+        "total_alerts": 0,
+        "mean_detection_delay_s": 0,
+        "by_anomaly_type": {},
+    }
+})
+
 
 class EvaluationConfigModel(BaseModel):
     time_window_s: float = 120.0
@@ -38,6 +92,52 @@ class OptimizeRequest(BaseModel):
     param_ranges: Optional[List[Dict[str, float]]] = None  # [{name, min, max, step}]
 
 
+@lru_cache(maxsize=1)
+def _default_rule_engine() -> AlertRuleEngine:
+    """默认规则引擎（进程内只构建一次，只读使用）"""
+    engine = AlertRuleEngine()
+    for r in create_default_rules():
+        engine.add_rule(r)
+    return engine
+
+
+_MATCH_DETAIL_LIMIT = 200
+
+
+def _match_details(matches: list, limit: int = _MATCH_DETAIL_LIMIT) -> dict:
+    """前 limit 条匹配明细，按列返回 {字段: [值, ...]}（比逐行字典体积小、序列化快）"""
+    alert_time, truth_time, rule_name, event_type = [], [], [], []
+    severity, position_km, matched = [], [], []
+    for m in matches[:limit]:
+        alert, gt = m.alert_event, m.ground_truth
+        if alert:
+            alert_time.append(alert.timestamp)
+            rule_name.append(alert.rule_name)
+            severity.append(alert.severity)
+        else:
+            alert_time.append(0)
+            rule_name.append("")
+            severity.append("medium")
+        if gt:
+            truth_time.append(gt.trigger_time)
+            event_type.append(gt.anomaly_type)
+            position_km.append(gt.position_km)
+        else:
+            truth_time.append(0)
+            event_type.append("")
+            position_km.append(0)
+        matched.append(m.matched)
+    return {
+        "alert_time": alert_time,
+        "truth_time": truth_time,
+        "rule_name": rule_name,
+        "event_type": event_type,
+        "severity": severity,
+        "position_km": position_km,
+        "matched": matched,
+    }
+
+
 # ==================== 评估端点 ====================
 
 @router.get("/metrics")
@@ -49,7 +149,7 @@ async def get_evaluation_metrics():
             "data": None,
             "message": "暂无评估数据，请先完成一次仿真"
         }
-    return {"success": True, "data": _last_evaluation}
+    return json_response({"success": True, "data": _last_evaluation})
 
 
 @router.post("/evaluate")
@@ -66,55 +166,29 @@ async def run_evaluation(config: EvaluationConfigModel):
     )
 
     metrics, matches, cat_metrics = evaluator.evaluate(
-        _last_ground_truths, _last_alert_events
+        _last_ground_truths, _last_alert_events, index=_last_alert_index()
     )
 
     result = {
         'metrics': metrics.to_dict(),
         'category_metrics': cat_metrics.to_dict(),
-        'match_details': [
-            {
-                'ground_truth': {
-                    'vehicle_id': m.ground_truth.vehicle_id,
-                    'anomaly_type': m.ground_truth.anomaly_type,
-                    'trigger_time': m.ground_truth.trigger_time,
-                    'position_km': m.ground_truth.position_km,
-                },
-                'matched': m.matched,
-                'detection_delay': m.detection_delay,
-                'position_error_km': m.position_error_km,
-                'alert_rule': m.alert_event.rule_name if m.alert_event else None,
-            }
-            for m in matches[:100]  # 限制返回数量
-        ],
+        'match_details': _match_details(matches),
     }
 
     _last_evaluation = result
-    return {"success": True, "data": result}
+    return json_response({"success": True, "data": result})
 
 
 @router.get("/summary")
 async def get_evaluation_summary():
     """获取评估摘要（用于仪表板展示）"""
     if _last_evaluation is None:
-        # 返回空的摘要结构
-        return {
-            "success": True,
-            "data": {
-                "precision": 0,
-                "recall": 0,
-                "f1_score": 0,
-                "total_ground_truths": 0,
-                "total_alerts": 0,
-                "mean_detection_delay_s": 0,
-                "by_anomaly_type": {},
-            }
-        }
+        return Response(content=_EMPTY_SUMMARY_JSON, media_type="application/json")
 
     m = _last_evaluation.get('metrics', {})
     cat = _last_evaluation.get('category_metrics', {})
 
-    return {
+    return json_response({
         "success": True,
         "data": {
             "precision": m.get('precision', 0),
@@ -125,7 +199,7 @@ async def get_evaluation_summary():
             "mean_detection_delay_s": m.get('mean_detection_delay_s', 0),
             "by_anomaly_type": cat.get('by_anomaly_type', {}),
         }
-    }
+    })
 
 
 @router.post("/run")
@@ -151,7 +225,7 @@ async def run_evaluation_with_params(config: EvaluationConfigModel):
     )
 
     metrics, matches, cat_metrics = evaluator.evaluate(
-        _last_ground_truths, _last_alert_events
+        _last_ground_truths, _last_alert_events, index=_last_alert_index()
     )
 
     # 从上一次评估结果中读取 segment_boundaries 和 total_vehicles
@@ -183,18 +257,7 @@ async def run_evaluation_with_params(config: EvaluationConfigModel):
         "total_vehicles": total_vehicles,
         "segment_boundaries": segment_boundaries,
         "gantry_stats": gantry_stats,
-        "match_details": [
-            {
-                "alert_time": m.alert_event.timestamp if m.alert_event else 0,
-                "truth_time": m.ground_truth.trigger_time if m.ground_truth else 0,
-                "rule_name": m.alert_event.rule_name if m.alert_event else "",
-                "event_type": m.ground_truth.anomaly_type if m.ground_truth else "",
-                "severity": m.alert_event.severity if m.alert_event else "medium",
-                "position_km": m.ground_truth.position_km if m.ground_truth else 0,
-                "matched": m.matched,
-            }
-            for m in matches[:200]
-        ],
+        "match_details": _match_details(matches),
         "type_metrics": {
             k: {"precision": v.precision, "recall": v.recall,
                 "f1_score": v.f1_score, "count": v.total_ground_truths}
@@ -203,7 +266,7 @@ async def run_evaluation_with_params(config: EvaluationConfigModel):
     }
 
     _last_evaluation = result
-    return {"success": True, "data": result}
+    return json_response({"success": True, "data": result})
 
 
 class EvaluateFileRequest(BaseModel):
@@ -220,20 +283,39 @@ async def evaluate_from_file(req: EvaluateFileRequest):
     后端分批读取，无需前端传输大文件。
     """
     global _last_evaluation, _last_ground_truths, _last_alert_events
-    import json
+    import asyncio
     from pathlib import Path
 
     project_root = Path(__file__).resolve().parents[2]
     output_dir = project_root / "output"
     target = (output_dir / req.file_path).resolve()
 
-    if not str(target).startswith(str(output_dir)):
+    if not target.is_relative_to(output_dir):
         raise HTTPException(400, "路径越界")
     if not target.exists():
         raise HTTPException(404, "文件不存在")
 
+    st = target.stat()
+    cache_key = (
+        str(target), st.st_mtime_ns, st.st_size,
+        round(req.time_window_s, 3), round(req.distance_window_km, 3),
+    )
+    cached = _file_eval_cache.get(cache_key)
+    if cached is not None:
+        _file_eval_cache.move_to_end(cache_key)
+        response, ground_truths = cached
+        if ground_truths is not None:
+            if ground_truths is not _last_ground_truths:
+                _last_ground_truths = ground_truths
+                _clear_result_caches()
+            _last_evaluation = response["data"]
+        return json_response(response)
+
+    # 流式解析：只物化 anomaly_logs 与 config，trajectory_data 只计数不建对象
     try:
-        data = json.loads(target.read_text(encoding="utf-8"))
+        data, counts = await asyncio.to_thread(
+            scan_json, target, ("anomaly_logs", "config"), ("trajectory_data",)
+        )
     except Exception as e:
         raise HTTPException(400, f"JSON 解析失败: {e}")
 
@@ -241,13 +323,15 @@ async def evaluate_from_file(req: EvaluateFileRequest):
     anomaly_logs = data.get('anomaly_logs', [])
     # 兼容新旧格式获取轨迹记录数
     from etc_sim.backend.services.trajectory_storage import TrajectoryStorage
-    trajectory_count = len(data.get('trajectory_data', []))
+    trajectory_count = counts.get('trajectory_data', 0)
     if trajectory_count == 0:
         trajectory_count = TrajectoryStorage.get_record_count(str(target.parent))
     config = data.get('config', {})
     segment_boundaries = config.get('segment_boundaries', [])
     total_vehicles = int(config.get('total_vehicles', 0))
 
+    # 逐条构造即可：耗时主要在 GroundTruthEvent 构造本身，
+    # 先转 DataFrame 再 itertuples 实测反而慢约一倍 (DataFrame 构建 + numpy 标量回转)
     ground_truths = []
     for log in anomaly_logs:
         gt = GroundTruthEvent(
@@ -262,7 +346,7 @@ async def evaluate_from_file(req: EvaluateFileRequest):
 
     # 没有真值数据时仍然返回空指标
     if not ground_truths:
-        return {
+        response = {
             "success": True,
             "data": {
                 "precision": 0, "recall": 0, "f1_score": 0,
@@ -282,8 +366,11 @@ async def evaluate_from_file(req: EvaluateFileRequest):
                 "config": config,
             },
         }
+        _put_file_eval(cache_key, response, None)
+        return json_response(response)
 
     _last_ground_truths = ground_truths
+    _clear_result_caches()
 
     evaluator = AlertEvaluator(
         time_window_s=req.time_window_s,
@@ -292,7 +379,7 @@ async def evaluate_from_file(req: EvaluateFileRequest):
 
     # 使用已有的 alert_events 或空列表
     metrics, matches, cat_metrics = evaluator.evaluate(
-        _last_ground_truths, _last_alert_events
+        _last_ground_truths, _last_alert_events, index=_last_alert_index()
     )
 
     tn = max(total_vehicles - metrics.true_positives - metrics.false_positives - metrics.false_negatives, 0)
@@ -320,18 +407,7 @@ async def evaluate_from_file(req: EvaluateFileRequest):
         "total_vehicles": total_vehicles,
         "segment_boundaries": segment_boundaries,
         "gantry_stats": gantry_stats,
-        "match_details": [
-            {
-                "alert_time": m.alert_event.timestamp if m.alert_event else 0,
-                "truth_time": m.ground_truth.trigger_time if m.ground_truth else 0,
-                "rule_name": m.alert_event.rule_name if m.alert_event else "",
-                "event_type": m.ground_truth.anomaly_type if m.ground_truth else "",
-                "severity": m.alert_event.severity if m.alert_event else "medium",
-                "position_km": m.ground_truth.position_km if m.ground_truth else 0,
-                "matched": m.matched,
-            }
-            for m in matches[:200]
-        ],
+        "match_details": _match_details(matches),
         "type_metrics": {
             k: {"precision": v.precision, "recall": v.recall,
                 "f1_score": v.f1_score, "count": v.total_ground_truths}
@@ -341,7 +417,7 @@ async def evaluate_from_file(req: EvaluateFileRequest):
 
     _last_evaluation = result
     logger.info(f"File evaluation complete: GT={len(ground_truths)}, F1={metrics.f1_score:.4f}")
-    return {
+    response = {
         "success": True,
         "data": result,
         "file_info": {
@@ -350,6 +426,16 @@ async def evaluate_from_file(req: EvaluateFileRequest):
             "config": config,
         },
     }
+    _put_file_eval(cache_key, response, ground_truths)
+    return json_response(response)
+
+
+def _put_file_eval(cache_key: tuple, response: dict, ground_truths: Optional[List[GroundTruthEvent]]):
+    """写入文件评估缓存，超出容量时淘汰最久未用的条目"""
+    _file_eval_cache[cache_key] = (response, ground_truths)
+    _file_eval_cache.move_to_end(cache_key)
+    while len(_file_eval_cache) > _FILE_EVAL_CACHE_SIZE:
+        _file_eval_cache.popitem(last=False)
 
 
 class SensitivityRequest(BaseModel):
@@ -366,21 +452,49 @@ async def sensitivity_analysis(req: SensitivityRequest):
     start, end, step = req.range[0], req.range[1], req.range[2]
     results = []
     
+    # 未知参数名按时间窗口处理
+    param = "distance_window" if req.param_name == "distance_window" else "time_window"
+
+    # 预警时间索引跨请求共享；真值 (时间, 位置) 列表及候选块与窗口取值无关，整个扫描只构建一次
+    # （全部命中缓存时不构建）；每个取值只做计数匹配，不构建匹配详情
+    index = gt_points = tiles = None
+    defaults = AlertEvaluator()
+    n_gt, n_alerts = len(_last_ground_truths), len(_last_alert_events)
+
     val = start
     while val <= end:
-        if req.param_name == "time_window":
-            evaluator = AlertEvaluator(time_window_s=val)
-        elif req.param_name == "distance_window":
-            evaluator = AlertEvaluator(distance_window_km=val)
-        else:
-            evaluator = AlertEvaluator(time_window_s=val)
-        
-        metrics, _, _ = evaluator.evaluate(_last_ground_truths, _last_alert_events)
+        key = (param, round(val, 6))
+        cached = _sens_cache.get(key)
+        if cached is None:
+            if param == "distance_window":
+                time_window_s, distance_window_km = defaults.time_window_s, val
+            else:
+                time_window_s, distance_window_km = val, defaults.distance_window_km
+
+            if index is None:
+                index = _last_alert_index()
+                gt_points = [(gt.trigger_time, gt.position_km) for gt in _last_ground_truths]
+                max_time_window_s = end if param == "time_window" else defaults.time_window_s
+                tiles = index.sweep_tiles(gt_points, max_time_window_s)
+            tp = index.count_matches(gt_points, time_window_s, distance_window_km, tiles=tiles)
+            metrics = EvaluationMetrics(
+                total_ground_truths=n_gt,
+                total_alerts=n_alerts,
+                true_positives=tp,
+                false_positives=n_alerts - tp,
+                false_negatives=n_gt - tp,
+            )
+            cached = (metrics.f1_score, metrics.precision, metrics.recall)
+            if len(_sens_cache) >= _SENS_CACHE_SIZE:
+                _sens_cache.clear()
+            _sens_cache[key] = cached
+
+        f1, precision, recall = cached
         results.append({
             "paramValue": val,
-            "f1Score": metrics.f1_score,
-            "precision": metrics.precision,
-            "recall": metrics.recall,
+            "f1Score": f1,
+            "precision": precision,
+            "recall": recall,
         })
         val += step
 
@@ -393,14 +507,11 @@ async def optimize_rule(req: OptimizeRequest):
     if not _last_ground_truths:
         raise HTTPException(status_code=400, detail="暂无真值数据")
 
-    # 获取规则引擎
-    engine = AlertRuleEngine()
-    for r in create_default_rules():
-        engine.add_rule(r)
-
-    rule = engine.get_rule(req.rule_name)
+    rule = _default_rule_engine().get_rule(req.rule_name)
     if not rule:
         raise HTTPException(status_code=404, detail=f"规则 '{req.rule_name}' 不存在")
+    # 优化器会把最优参数写回规则，使用副本以免污染缓存的默认规则
+    rule = copy.deepcopy(rule)
 
     # 构建参数范围
     if req.param_ranges:
@@ -420,18 +531,32 @@ async def optimize_rule(req: OptimizeRequest):
             }
         ranges = {req.condition_index: ranges[req.condition_index]}
 
-    optimizer = AlertOptimizer()
-    results = optimizer.optimize_rule(
-        rule=rule,
-        param_ranges=ranges,
-        context_snapshots=[],
-        ground_truths=_last_ground_truths,
-        max_iterations=200,
+    cache_key = (
+        req.rule_name,
+        req.condition_index,
+        tuple(
+            (r.name, r.min_val, r.max_val, r.step)
+            for r in ranges[req.condition_index]
+        ),
     )
+    data = _optimize_cache.get(cache_key)
+    if data is None:
+        optimizer = AlertOptimizer()
+        results = optimizer.optimize_rule(
+            rule=rule,
+            param_ranges=ranges,
+            context_snapshots=[],
+            ground_truths=_last_ground_truths,
+            max_iterations=200,
+        )
+        data = [r.to_dict() for r in results]
+        if len(_optimize_cache) >= _OPTIMIZE_CACHE_SIZE:
+            _optimize_cache.clear()
+        _optimize_cache[cache_key] = data
 
     return {
         "success": True,
-        "data": [r.to_dict() for r in results]
+        "data": data
     }
 
 
@@ -451,10 +576,12 @@ def store_evaluation_data(engine_instance) -> Dict[str, Any]:
 
     _last_ground_truths = extract_ground_truths_from_engine(engine_instance)
     _last_alert_events = extract_alert_events_from_engine(engine_instance)
+    _clear_result_caches()
+    _file_eval_cache.clear()
 
     evaluator = AlertEvaluator()
     metrics, matches, cat_metrics = evaluator.evaluate(
-        _last_ground_truths, _last_alert_events
+        _last_ground_truths, _last_alert_events, index=_last_alert_index()
     )
 
     _last_evaluation = {
@@ -7,25 +7,32 @@
 
 
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from pathlib import Path
 from typing import Optional
+from array import array
+from collections import OrderedDict
+import asyncio
 import os
 import sys
 import json
-import subprocess
-import tempfile
 import datetime
 import logging
 
 from etc_sim.backend.services.run_repository import (
+    ML_DATASET_SIDECAR_SUFFIX,
     build_gate_descriptors,
     build_path_geometry,
     load_run_manifest,
     load_run_summary,
 )
 from etc_sim.backend.services.trajectory_storage import TrajectoryStorage
+from etc_sim.backend import sandbox_prelude
+from etc_sim.backend.services.dir_index import TreeListing, invalidate_tree_listings
+from etc_sim.backend.services.json_io import (
+    dumps as json_dumps, json_response, read_json, scan_json,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -42,47 +49,94 @@ SCRIPTS_DIR = ETC_SIM_DIR / "scripts"
 # 鍘嗗彶鏁版嵁鏂囦欢娴忚
 # ============================================
 
-def _scan_files(directory: Path, extensions: set = None) -> list:
-    """Recursively scan a directory and return file metadata."""
+def _scan_files(directory: Path, extensions: set = None, dir_mtimes: dict = None) -> list:
+    """Recursively scan a directory and return file metadata.
+
+    dir_mtimes 非空时记录访问到的每个目录的 mtime，供 TreeListing 判断结果是否过期。
+    """
     results = []
     if not directory.exists():
         return results
-    
-    for item in sorted(directory.rglob("*")):
-        if item.is_file():
-            if extensions and item.suffix.lower() not in extensions:
-                continue
-            try:
-                stat = item.stat()
+
+    # scandir 直接给出文件类型，扩展名不匹配的条目无需 stat 也不构造 Path
+    root = str(directory)
+    if extensions:
+        extensions = {e.lower() for e in extensions}
+    fromtimestamp = datetime.datetime.fromtimestamp
+    pending = [root]
+    while pending:
+        path = pending.pop()
+        try:
+            if dir_mtimes is not None:
+                dir_mtimes[path] = os.stat(path).st_mtime_ns
+            it = os.scandir(path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir() and not entry.is_symlink():
+                        pending.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                ext = os.path.splitext(entry.name)[1].lower()
+                if extensions and ext not in extensions:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
                 results.append({
-                    "name": item.name,
-                    "path": str(item.relative_to(directory)),
+                    "name": entry.name,
+                    "path": os.path.relpath(entry.path, root),
                     "size": stat.st_size,
-                    "modified": datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    "extension": item.suffix.lower(),
+                    "modified": fromtimestamp(stat.st_mtime).isoformat(),
+                    "extension": ext,
                 })
-            except Exception:
-                pass
+
+    # 按路径分量排序 (与 Path 比较规则一致)，避免为每个条目构造 Path
+    results.sort(key=lambda r: os.path.normcase(r["path"]).split(os.sep))
     return results
 
 
-def _scan_tree(directory: Path) -> list:
+def _scan_tree(directory: Path, dir_mtimes: dict = None) -> list:
     """Scan a directory tree."""
-    result = []
     if not directory.exists():
-        return result
-    
-    for item in sorted(directory.iterdir()):
+        return []
+    return _scan_tree_level(str(directory), dir_mtimes)
+
+
+def _scan_tree_level(path: str, dir_mtimes: dict = None) -> list:
+    """列出单层目录并递归子目录；与 _scan_files 一致跳过指向目录的符号链接，避免链接成环时无限递归"""
+    try:
+        if dir_mtimes is not None:
+            dir_mtimes[path] = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: os.path.normcase(e.name))
+    except OSError:
+        return []
+
+    result = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if not is_dir and entry.is_symlink() and entry.is_dir():
+                continue
+        except OSError:
+            continue
         node = {
-            "name": item.name,
-            "path": str(item.relative_to(directory)),
-            "isDir": item.is_dir(),
+            "name": entry.name,
+            "path": entry.name,
+            "isDir": is_dir,
         }
-        if item.is_dir():
-            node["children"] = _scan_tree(item)
+        if is_dir:
+            node["children"] = _scan_tree_level(entry.path, dir_mtimes)
         else:
             try:
-                stat = item.stat()
+                stat = entry.stat()
                 node["size"] = stat.st_size
                 node["modified"] = datetime.datetime.fromtimestamp(stat.st_mtime).isoformat()
             except Exception:
@@ -91,52 +145,91 @@ def _scan_tree(directory: Path) -> list:
     return result
 
 
+# 输出文件摘要缓存 {file_path: (mtime_ns, size, meta)}
+_meta_cache: dict = {}
+_RUN_META_KEYS = ("metadata", "config", "statistics")
+
+
+def _extract_run_meta(fpath: Path) -> dict:
+    """流式读取 metadata/config/statistics 顶层字段并提取仿真参数摘要，不解析轨迹数组"""
+    try:
+        data, _ = scan_json(fpath, keep=_RUN_META_KEYS)
+    except Exception:
+        data = {}
+
+    meta = {}
+    # 浠?metadata 鎴?config 鎴?statistics 涓彁鍙栧叧閿弬鏁?
+    cfg = data.get("metadata", {}).get("config", data.get("config", {}))
+    stats = data.get("statistics", data.get("metadata", {}).get("statistics", {}))
+    
+    if cfg:
+        if "totalVehicles" in cfg or "total_vehicles" in cfg:
+            meta["vehicles"] = cfg.get("totalVehicles", cfg.get("total_vehicles"))
+        if "numLanes" in cfg or "num_lanes" in cfg:
+            meta["lanes"] = cfg.get("numLanes", cfg.get("num_lanes"))
+        if "roadLength" in cfg or "road_length" in cfg:
+            meta["road_km"] = round((cfg.get("roadLength", cfg.get("road_length", 0))) / 1000, 1)
+        if "simulationTime" in cfg or "simulation_time" in cfg:
+            meta["sim_time"] = cfg.get("simulationTime", cfg.get("simulation_time"))
+    
+    if stats:
+        if "avgSpeed" in stats:
+            meta["avg_speed"] = round(stats["avgSpeed"], 1)
+        if "totalAnomalies" in stats:
+            meta["anomalies"] = stats["totalAnomalies"]
+    
+    if data.get("metadata", {}).get("exported_at"):
+        meta["exported_at"] = data["metadata"]["exported_at"]
+    
+    return meta
+
+
+def _attach_run_meta(files: list):
+    """为 JSON 文件附加摘要，文件 mtime/size 未变时直接复用缓存"""
+    seen = set()
+    for f in files:
+        if f["extension"] != ".json":
+            continue
+        fpath = OUTPUT_DIR / f["path"]
+        cache_key = str(fpath)
+        seen.add(cache_key)
+        try:
+            st = fpath.stat()
+        except OSError:
+            f["meta"] = {}
+            continue
+        cached = _meta_cache.get(cache_key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            f["meta"] = cached[2]
+            continue
+        meta = _extract_run_meta(fpath)
+        _meta_cache[cache_key] = (st.st_mtime_ns, st.st_size, meta)
+        f["meta"] = meta
+
+    for stale in _meta_cache.keys() - seen:
+        del _meta_cache[stale]
+
+
+def _scan_output_files(dir_mtimes: dict) -> list:
+    # 预测模块的 ml_dataset 缓存不是仿真输出，不对用户展示
+    files = [
+        f for f in _scan_files(OUTPUT_DIR, {".csv", ".json"}, dir_mtimes)
+        if not f["name"].endswith(ML_DATASET_SIDECAR_SUFFIX)
+    ]
+    _attach_run_meta(files)
+    return files
+
+
+# 前端会反复轮询以下列表，目录树未变化时直接复用上次结果
+_output_listing = TreeListing(OUTPUT_DIR, _scan_output_files)
+_script_list = TreeListing(SCRIPTS_DIR, lambda dir_mtimes: _scan_files(SCRIPTS_DIR, {".py"}, dir_mtimes))
+_script_tree = TreeListing(SCRIPTS_DIR, lambda dir_mtimes: _scan_tree(SCRIPTS_DIR, dir_mtimes))
+
+
 @router.get("/output-files")
 async def list_output_files():
     """List output data files."""
-    files = _scan_files(OUTPUT_DIR, extensions={".csv", ".json"})
-    
-    # 瀵?JSON 鏂囦欢灏濊瘯鎻愬彇浠跨湡鍙傛暟鎽樿
-    for f in files:
-        if f["extension"] == ".json":
-            try:
-                fpath = OUTPUT_DIR / f["path"]
-                with open(fpath, "r", encoding="utf-8") as fp:
-                    # 鍙鍓?2000 瀛楃蹇€熸彁鍙?
-                    head = fp.read(2000)
-                data = json.loads(head if head.rstrip().endswith('}') else head + ']}')
-            except Exception:
-                try:
-                    data = json.loads((OUTPUT_DIR / f["path"]).read_text(encoding="utf-8"))
-                except Exception:
-                    data = {}
-            
-            meta = {}
-            # 浠?metadata 鎴?config 鎴?statistics 涓彁鍙栧叧閿弬鏁?
-            cfg = data.get("metadata", {}).get("config", data.get("config", {}))
-            stats = data.get("statistics", data.get("metadata", {}).get("statistics", {}))
-            
-            if cfg:
-                if "totalVehicles" in cfg or "total_vehicles" in cfg:
-                    meta["vehicles"] = cfg.get("totalVehicles", cfg.get("total_vehicles"))
-                if "numLanes" in cfg or "num_lanes" in cfg:
-                    meta["lanes"] = cfg.get("numLanes", cfg.get("num_lanes"))
-                if "roadLength" in cfg or "road_length" in cfg:
-                    meta["road_km"] = round((cfg.get("roadLength", cfg.get("road_length", 0))) / 1000, 1)
-                if "simulationTime" in cfg or "simulation_time" in cfg:
-                    meta["sim_time"] = cfg.get("simulationTime", cfg.get("simulation_time"))
-            
-            if stats:
-                if "avgSpeed" in stats:
-                    meta["avg_speed"] = round(stats["avgSpeed"], 1)
-                if "totalAnomalies" in stats:
-                    meta["anomalies"] = stats["totalAnomalies"]
-            
-            if data.get("metadata", {}).get("exported_at"):
-                meta["exported_at"] = data["metadata"]["exported_at"]
-            
-            f["meta"] = meta
-    
+    files = await asyncio.to_thread(_output_listing.get)
     return {"dir": str(OUTPUT_DIR), "files": files}
 
 
@@ -144,7 +237,7 @@ async def list_output_files():
 async def read_output_file(path: str):
     """Read a small output file."""
     target = (OUTPUT_DIR / path).resolve()
-    if not str(target).startswith(str(OUTPUT_DIR)):
+    if not target.is_relative_to(OUTPUT_DIR):
         raise HTTPException(400, "????")
     if not target.exists():
         raise HTTPException(404, "?????")
@@ -157,8 +250,13 @@ async def read_output_file(path: str):
             f"鏂囦欢杩囧ぇ ({size / 1024 / 1024:.1f}MB)锛岃浣跨敤鍒嗗潡鍔犺浇 API: /output-file-info + /output-file-chunk"
         )
     
+    return await asyncio.to_thread(_read_small_output, target)
+
+
+def _read_small_output(target: Path) -> dict:
+    """读取并解析小文件 (在线程池中执行，避免阻塞事件循环)"""
     content = target.read_text(encoding="utf-8")
-    
+
     if target.suffix.lower() == ".json":
         try:
             return {"type": "json", "data": json.loads(content)}
@@ -172,18 +270,12 @@ async def read_output_file(path: str):
 # 澶ф枃浠跺垎鍧楀姞杞?API
 # ============================================
 
-def _default_path_id(lane: int, config: Optional[dict] = None) -> str:
-    prefix = "custom_lane" if (config or {}).get("custom_road_path") else "main_lane"
-    return f"{prefix}_{lane}"
+def _path_id_prefix(config: Optional[dict] = None) -> str:
+    return "custom_lane" if (config or {}).get("custom_road_path") else "main_lane"
 
 
-def _vehicle_path_fields(entry: dict, lane: int, config: Optional[dict] = None) -> dict:
-    x_pos = entry.get("pos", entry.get("x", 0))
-    return {
-        "path_id": entry.get("path_id", _default_path_id(lane, config)),
-        "s": entry.get("s", x_pos),
-        "offset": entry.get("offset", 0.0),
-    }
+def _default_path_id(lane: int, config: Optional[dict] = None) -> str:
+    return f"{_path_id_prefix(config)}_{lane}"
 
 
 def _resolve_replay_geometry(
@@ -205,6 +297,18 @@ def _read_json_payload(target: Path) -> dict:
         return {}
 
 
+_REPLAY_META_KEYS = ("config", "etcGates", "pathGeometry")
+_REPLAY_COUNT_KEYS = ("trajectory_data", "frames", "finished_vehicles", "anomaly_logs", "")
+
+
+def _scan_replay_payload(target: Path):
+    """流式读取回放元数据：只物化 config/etcGates/pathGeometry，大数组只计数"""
+    try:
+        return scan_json(target, keep=_REPLAY_META_KEYS, count=_REPLAY_COUNT_KEYS)
+    except Exception:
+        return {}, {}
+
+
 def _load_replay_metadata(target: Path) -> dict:
     run_dir = target.parent
     summary = load_run_summary(run_dir)
@@ -238,7 +342,7 @@ def _load_replay_metadata(target: Path) -> dict:
             anomaly_count = int(summary_fields.get("total_anomalies", 0) or 0)
 
     if not config or not total_frames:
-        data = _read_json_payload(target)
+        data, counts = _scan_replay_payload(target)
         if not config:
             config = data.get("config", {}) or {}
         if etc_gates is None:
@@ -246,16 +350,16 @@ def _load_replay_metadata(target: Path) -> dict:
         if path_geometry is None:
             path_geometry = data.get("pathGeometry")
         if not total_frames:
-            if isinstance(data.get("trajectory_data"), list):
-                total_frames = len(data["trajectory_data"])
-            elif isinstance(data.get("frames"), list):
-                total_frames = len(data["frames"])
-            elif isinstance(data, list):
-                total_frames = len(data)
+            if "trajectory_data" in counts:
+                total_frames = counts["trajectory_data"]
+            elif "frames" in counts:
+                total_frames = counts["frames"]
+            elif "" in counts:
+                total_frames = counts[""]
         if not finished_vehicles_count:
-            finished_vehicles_count = len(data.get("finished_vehicles", []))
+            finished_vehicles_count = counts.get("finished_vehicles", 0)
         if not anomaly_count:
-            anomaly_count = len(data.get("anomaly_logs", []))
+            anomaly_count = counts.get("anomaly_logs", 0)
 
     etc_gates, path_geometry = _resolve_replay_geometry(config, etc_gates, path_geometry)
 
@@ -273,28 +377,85 @@ def _trajectory_to_frames(trajectory_data: list, config: dict = None) -> list:
     """Convert flat trajectory records into replay frames."""
     from collections import defaultdict
 
+    # 单次遍历内联字段回退，路径前缀只计算一次
+    prefix = _path_id_prefix(config)
     frame_map = defaultdict(list)
     for entry in trajectory_data:
-        t = entry.get("time", 0)
-        rt = round(t * 2) / 2
-        lane = entry.get("lane", 0)
-        vehicle = {
-            "id": entry.get("id", 0),
-            "x": entry.get("pos", entry.get("x", 0)),
+        get = entry.get
+        lane = get("lane", 0)
+        x_pos = entry["pos"] if "pos" in entry else get("x", 0)
+        frame_map[round(get("time", 0) * 2) / 2].append({
+            "id": get("id", 0),
+            "x": x_pos,
             "lane": lane,
-            "speed": entry.get("speed", 0),
-            "type": entry.get("vehicle_type", entry.get("type", "CAR")),
-            "anomaly": entry.get("anomaly_type", entry.get("anomaly", 0)),
-        }
-        vehicle.update(_vehicle_path_fields(entry, lane, config))
-        frame_map[rt].append(vehicle)
+            "speed": get("speed", 0),
+            "type": entry["vehicle_type"] if "vehicle_type" in entry else get("type", "CAR"),
+            "anomaly": entry["anomaly_type"] if "anomaly_type" in entry else get("anomaly", 0),
+            "path_id": entry["path_id"] if "path_id" in entry else f"{prefix}_{lane}",
+            "s": get("s", x_pos),
+            "offset": get("offset", 0.0),
+        })
 
-    frames = [{"time": t, "vehicles": frame_map[t]} for t in sorted(frame_map.keys())]
-    return frames
+    return [{"time": t, "vehicles": frame_map[t]} for t in sorted(frame_map)]
 
 
 # ????????????
-_frame_cache: dict = {}  # {file_path: {'frames': [...], 'config': {...}, 'ts': mtime}}
+# 回放帧 LRU 缓存 {file_path: {'frames': [...], 'config': {...}, 'ts': mtime, 'est_bytes': n}}
+# 同时受条目数与估算内存上限约束，最新载入的文件总会保留
+_FRAME_CACHE_SIZE = 3
+_FRAME_CACHE_MAX_BYTES = int(os.getenv("FRAME_CACHE_MAX_MB", "512")) * 1024 * 1024
+_frame_cache: "OrderedDict[str, dict]" = OrderedDict()
+_frame_cache_bytes = 0
+_frame_cache_hits = 0
+_frame_cache_misses = 0
+
+# CSV 行偏移索引 {file_path: (mtime_ns, size, offsets)}
+# offsets[i] 为第 i 行的起始字节，末项为文件长度，分页时按字节区间 seek 读取
+_csv_offset_cache: dict = {}
+_CSV_OFFSET_CACHE_SIZE = 8
+
+
+def _csv_line_offsets(target: Path) -> array:
+    """获取 CSV 行偏移索引，文件 mtime/size 变化时重建"""
+    st = target.stat()
+    cache_key = str(target)
+    cached = _csv_offset_cache.get(cache_key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    offsets = array('q', [0])
+    pos = 0
+    with open(target, 'rb') as f:
+        for line in f:
+            pos += len(line)
+            offsets.append(pos)
+
+    if cache_key not in _csv_offset_cache and len(_csv_offset_cache) >= _CSV_OFFSET_CACHE_SIZE:
+        _csv_offset_cache.pop(next(iter(_csv_offset_cache)), None)
+    _csv_offset_cache[cache_key] = (st.st_mtime_ns, st.st_size, offsets)
+    return offsets
+
+
+def _read_csv_lines(target: Path, offsets: array, start: int, stop: int) -> list:
+    """一次读取第 [start, stop) 行，返回去除首尾空白的文本行"""
+    stop = min(stop, len(offsets) - 1)
+    if start >= stop:
+        return []
+    with open(target, 'rb') as f:
+        f.seek(offsets[start])
+        raw = f.read(offsets[stop] - offsets[start])
+    return [line.strip() for line in raw.decode('utf-8').split('\n')[:stop - start]]
+
+
+def _read_csv_chunk(target: Path, offset: int, limit: int) -> tuple:
+    """读取表头及第 offset 行起的 limit 行数据，返回 (csv_text, total_lines)"""
+    offsets = _csv_line_offsets(target)
+    total_lines = len(offsets) - 1
+    header_lines = _read_csv_lines(target, offsets, 0, 1)
+    headers = header_lines[0] if header_lines else None
+    lines = _read_csv_lines(target, offsets, max(offset + 1, 1), offset + limit + 1)
+    csv_text = headers + '\n' + '\n'.join(lines) if headers else '\n'.join(lines)
+    return csv_text, total_lines
 
 
 def _msgpack_frames_to_api_frames(traj_data: dict, config: dict = None) -> list:
@@ -329,15 +490,85 @@ def _msgpack_frames_to_api_frames(traj_data: dict, config: dict = None) -> list:
     return api_frames
 
 
+def _estimate_frames_bytes(frames: list, sample: int = 100) -> int:
+    """按前 sample 帧 (含车辆字典) 的平均大小估算整个帧列表的内存占用"""
+    if not frames:
+        return sys.getsizeof(frames)
+    head = frames[:sample]
+    sampled = 0
+    for frame in head:
+        sampled += sys.getsizeof(frame)
+        vehicles = frame.get("vehicles") if isinstance(frame, dict) else None
+        if isinstance(vehicles, list):
+            sampled += sys.getsizeof(vehicles) + sum(sys.getsizeof(v) for v in vehicles)
+    return sys.getsizeof(frames) + sampled * len(frames) // len(head)
+
+
+def _frame_cache_put(cache_key: str, entry: dict):
+    """写入帧缓存，按 LRU 顺序淘汰直至满足条目数与内存上限"""
+    global _frame_cache_bytes
+    old = _frame_cache.pop(cache_key, None)
+    if old is not None:
+        _frame_cache_bytes -= old['est_bytes']
+
+    entry['est_bytes'] = _estimate_frames_bytes(entry['frames'])
+    _frame_cache[cache_key] = entry
+    _frame_cache_bytes += entry['est_bytes']
+
+    while len(_frame_cache) > 1 and (
+        len(_frame_cache) > _FRAME_CACHE_SIZE or _frame_cache_bytes > _FRAME_CACHE_MAX_BYTES
+    ):
+        _, evicted = _frame_cache.popitem(last=False)
+        _frame_cache_bytes -= evicted['est_bytes']
+
+
+def _frame_cache_stats() -> dict:
+    """帧缓存命中统计"""
+    lookups = _frame_cache_hits + _frame_cache_misses
+    return {
+        "entries": len(_frame_cache),
+        "est_bytes": _frame_cache_bytes,
+        "hits": _frame_cache_hits,
+        "misses": _frame_cache_misses,
+        "hit_rate": round(_frame_cache_hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def _encoded_frames(cache: dict) -> list:
+    """逐帧 orjson 编码结果，首次分页时生成并随帧缓存保留 (计入内存估算)"""
+    global _frame_cache_bytes
+    encoded = cache.get('encoded_frames')
+    if encoded is None:
+        encoded = [json_dumps(frame) for frame in cache['frames']]
+        cache['encoded_frames'] = encoded
+        extra = sys.getsizeof(encoded) + sum(sys.getsizeof(b) for b in encoded)
+        cache['est_bytes'] = cache.get('est_bytes', 0) + extra
+        if any(entry is cache for entry in _frame_cache.values()):
+            _frame_cache_bytes += extra
+    return encoded
+
+
+def _frames_chunk_response(cache: dict, offset: int, limit: int, fields: dict) -> Response:
+    """分页帧响应：帧区间直接拼接预编码字节，其余字段单独序列化"""
+    chunk = b','.join(_encoded_frames(cache)[offset:offset + limit])
+    rest = json_dumps(fields)
+    body = b'{"frames":[' + chunk + (b'],' + rest[1:] if len(rest) > 2 else b']}')
+    return Response(content=body, media_type="application/json")
+
+
 def _get_frames_for_file(target: Path) -> dict:
     """Load replay frames for a target file with cache support."""
-    global _frame_cache
+    global _frame_cache_hits, _frame_cache_misses
     mtime = target.stat().st_mtime
     cache_key = str(target)
-    
-    if cache_key in _frame_cache and _frame_cache[cache_key]['ts'] == mtime:
-        return _frame_cache[cache_key]
-    
+
+    cached = _frame_cache.get(cache_key)
+    if cached is not None and cached['ts'] == mtime:
+        _frame_cache.move_to_end(cache_key)
+        _frame_cache_hits += 1
+        return cached
+    _frame_cache_misses += 1
+
     metadata = _load_replay_metadata(target)
     config = metadata["config"]
     etc_gates = metadata["etcGates"]
@@ -389,12 +620,7 @@ def _get_frames_for_file(target: Path) -> dict:
         "pathGeometry": path_geometry,
     }
     
-    # 浠呯紦瀛樻渶杩?3 涓枃浠讹紝閬垮厤鍐呭瓨鐖嗙偢
-    if len(_frame_cache) >= 3:
-        oldest_key = min(_frame_cache, key=lambda k: _frame_cache[k]['ts'])
-        del _frame_cache[oldest_key]
-    
-    _frame_cache[cache_key] = result
+    _frame_cache_put(cache_key, result)
     return result
 
 
@@ -402,7 +628,7 @@ def _get_frames_for_file(target: Path) -> dict:
 async def get_output_file_info(path: str):
     """Get file metadata without returning frame payloads."""
     target = (OUTPUT_DIR / path).resolve()
-    if not str(target).startswith(str(OUTPUT_DIR)):
+    if not target.is_relative_to(OUTPUT_DIR):
         raise HTTPException(400, "????")
     if not target.exists():
         raise HTTPException(404, "?????")
@@ -411,10 +637,7 @@ async def get_output_file_info(path: str):
     
     if target.suffix.lower() != '.json':
         # CSV 鏂囦欢锛氳绠楄鏁?
-        line_count = 0
-        with open(target, 'r', encoding='utf-8') as f:
-            for _ in f:
-                line_count += 1
+        line_count = len(await asyncio.to_thread(_csv_line_offsets, target)) - 1
         return {
             "path": path,
             "size": size,
@@ -424,7 +647,7 @@ async def get_output_file_info(path: str):
         }
     
     try:
-        metadata = _load_replay_metadata(target)
+        metadata = await asyncio.to_thread(_load_replay_metadata, target)
         return {
             "path": path,
             "size": size,
@@ -435,6 +658,7 @@ async def get_output_file_info(path: str):
             "anomaly_count": metadata["anomaly_count"],
             "etcGates": metadata["etcGates"],
             "pathGeometry": metadata["pathGeometry"],
+            "frame_cache": _frame_cache_stats(),
         }
     except Exception as e:
         logger.error(f"瑙ｆ瀽鏂囦欢淇℃伅澶辫触: {e}")
@@ -455,7 +679,7 @@ async def get_output_file_chunk(path: str, offset: int = 0, limit: int = 500):
 
 
     target = (OUTPUT_DIR / path).resolve()
-    if not str(target).startswith(str(OUTPUT_DIR)):
+    if not target.is_relative_to(OUTPUT_DIR):
         raise HTTPException(400, "????")
     if not target.exists():
         raise HTTPException(404, "?????")
@@ -464,40 +688,22 @@ async def get_output_file_chunk(path: str, offset: int = 0, limit: int = 500):
     
     if target.suffix.lower() == '.csv':
         # CSV 鍒嗗潡璇诲彇
-        lines = []
-        headers = None
-        current_line = 0
-        with open(target, 'r', encoding='utf-8') as f:
-            for line in f:
-                if current_line == 0:
-                    headers = line.strip()
-                elif current_line > offset and current_line <= offset + limit:
-                    lines.append(line.strip())
-                elif current_line > offset + limit:
-                    break
-                current_line += 1
-        
-        total_lines = current_line
-        csv_text = headers + '\n' + '\n'.join(lines) if headers else '\n'.join(lines)
-        return {
+        csv_text, total_lines = await asyncio.to_thread(_read_csv_chunk, target, offset, limit)
+        return json_response({
             "type": "csv",
             "data": csv_text,
             "offset": offset,
             "limit": limit,
             "total_lines": total_lines,
             "has_more": offset + limit < total_lines,
-        }
+        })
     
     try:
         cache = _get_frames_for_file(target)
-        frames = cache['frames']
         total = cache['total_frames']
-        
-        chunk = frames[offset:offset + limit]
-        
+
         result = {
             "type": "json",
-            "frames": chunk,
             "config": cache['config'] if offset == 0 else None,  # 浠呴娆¤繑鍥?config
             "etcGates": cache['etcGates'] if offset == 0 else None,
             "pathGeometry": cache['pathGeometry'] if offset == 0 else None,
@@ -506,7 +712,7 @@ async def get_output_file_chunk(path: str, offset: int = 0, limit: int = 500):
             "total_frames": total,
             "has_more": offset + limit < total,
         }
-        return result
+        return _frames_chunk_response(cache, offset, limit, result)
     except Exception as e:
         logger.error(f"鍒嗗潡璇诲彇澶辫触: {e}")
         raise HTTPException(500, f"璇诲彇澶辫触: {e}")
@@ -528,7 +734,7 @@ async def get_simulation_gates(path: str):
 
 
     target_dir = (OUTPUT_DIR / path).resolve()
-    if not str(target_dir).startswith(str(OUTPUT_DIR)):
+    if not target_dir.is_relative_to(OUTPUT_DIR):
         raise HTTPException(400, "????")
     
     data_file = target_dir / "data.json"
@@ -536,8 +742,7 @@ async def get_simulation_gates(path: str):
         raise HTTPException(404, f"?????????: {path}/data.json")
     
     try:
-        with open(data_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = await asyncio.to_thread(read_json, data_file)
     except json.JSONDecodeError:
         raise HTTPException(500, "??????????????? JSON")
     
@@ -607,7 +812,7 @@ async def get_simulation_gates(path: str):
 async def get_scripts_tree():
     """Get the scripts directory tree."""
     SCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
-    tree = _scan_tree(SCRIPTS_DIR)
+    tree = await asyncio.to_thread(_script_tree.get)
     return {"dir": str(SCRIPTS_DIR), "tree": tree}
 
 
@@ -615,7 +820,7 @@ async def get_scripts_tree():
 async def list_scripts():
     """List Python scripts."""
     SCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
-    files = _scan_files(SCRIPTS_DIR, extensions={".py"})
+    files = await asyncio.to_thread(_script_list.get)
     return {"dir": str(SCRIPTS_DIR), "files": files}
 
 
@@ -623,11 +828,12 @@ async def list_scripts():
 async def read_script(path: str):
     """Read a script file."""
     target = (SCRIPTS_DIR / path).resolve()
-    if not str(target).startswith(str(SCRIPTS_DIR)):
+    if not target.is_relative_to(SCRIPTS_DIR):
         raise HTTPException(400, "????")
     if not target.exists():
         raise HTTPException(404, "?????")
-    return {"path": path, "content": target.read_text(encoding="utf-8")}
+    content = await asyncio.to_thread(target.read_text, encoding="utf-8")
+    return {"path": path, "content": content}
 
 
 class SaveScriptRequest(BaseModel):
@@ -639,15 +845,35 @@ class SaveScriptRequest(BaseModel):
 async def save_script(req: SaveScriptRequest):
     """Save a script file."""
     target = (SCRIPTS_DIR / req.path).resolve()
-    if not str(target).startswith(str(SCRIPTS_DIR)):
+    if not target.is_relative_to(SCRIPTS_DIR):
         raise HTTPException(400, "????")
     
     target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_text(req.content, encoding="utf-8")
+    await asyncio.to_thread(target.write_text, req.content, encoding="utf-8")
+    # 覆写已有脚本不改变目录 mtime，需主动失效列表缓存
+    _script_list.invalidate()
+    _script_tree.invalidate()
     logger.info(f"Script saved: {target}")
     return {"status": "ok", "path": str(target)}
 
 
+# 脚本预置库 (ETCGateData 等) 位于 sandbox_prelude 模块，OUTPUT_DIR 与 sim_data_path 由调用方预先注入；
+# fork-server 子进程中按模块导入，独立子进程中按文件路径加载 (避免导入整个 etc_sim 包)
+_FORK_PRELUDE = (
+    "from etc_sim.backend.sandbox_prelude import install as _install_prelude\n"
+    "_install_prelude(globals())\n"
+    "del _install_prelude\n"
+)
+_SUBPROCESS_PRELUDE = (
+    "import importlib.util as _ilu\n"
+    f"_spec = _ilu.spec_from_file_location('sandbox_prelude', {sandbox_prelude.__file__!r})\n"
+    "_prelude = _ilu.module_from_spec(_spec)\n"
+    "_spec.loader.exec_module(_prelude)\n"
+    "_prelude.install(globals())\n"
+    "del _ilu, _spec, _prelude\n"
+)
+
+
 class RunScriptRequest(BaseModel):
     code: str
     timeout: int = 10
@@ -665,98 +891,49 @@ async def run_script(req: RunScriptRequest):
     # 纭畾鏁版嵁鐩綍
     if req.sim_run_dir:
         data_dir = (OUTPUT_DIR / req.sim_run_dir).resolve()
-        if not str(data_dir).startswith(str(OUTPUT_DIR)) or not data_dir.exists():
+        if not data_dir.is_relative_to(OUTPUT_DIR) or not data_dir.exists():
             data_dir = OUTPUT_DIR
     else:
         data_dir = OUTPUT_DIR
     
     # 棰勮浠跨湡鏁版嵁锛堝鏋滄寚瀹氫簡 sim_run_dir锛?
-    sim_data_json = "None"
-    if req.sim_run_dir:
-        data_json_path = data_dir / "data.json"
-        if data_json_path.exists():
-            try:
-                raw = data_json_path.read_text(encoding="utf-8")
-                # 楠岃瘉鏄悎娉?JSON
-                json.loads(raw)
-                sim_data_json = f'json.loads(r"""{raw}""")'
-            except Exception:
-                sim_data_json = "None"
-    
-    # 鏋勫缓瀹屾暣鑴氭湰锛堟敞鍏ュ伐鍏峰簱锛?
-    full_script = f'''
-import sys, os, json, csv
-from pathlib import Path
-from collections import Counter, defaultdict
+    # 只传递 data.json 路径，由子进程读取并解析 (见 sandbox_prelude.install)，父进程不读取、不 pickle 数据
+    sim_data_path = str(data_dir / "data.json") if req.sim_run_dir else None
 
-# 棰勬敞鍏ヨ矾寰?
-OUTPUT_DIR = r"{str(data_dir)}"
+    from .code_execution import _FORK_CTX, _run_forked, _run_process
 
-class ETCGateData:
-    """ETC gate data reader."""
-    
-    def __init__(self, output_dir=OUTPUT_DIR):
-        self.output_dir = Path(output_dir)
-    
-    def list_files(self, ext=".csv"):
-        """List data files."""
-        return [str(f.relative_to(self.output_dir)) for f in self.output_dir.rglob(f"*{{ext}}")]
-    
-    def read_csv(self, path):
-        """Read a CSV file into dict rows."""
-        full = self.output_dir / path
-        if not full.exists():
-            return []
-        with open(full, "r", encoding="utf-8") as f:
-            return list(csv.DictReader(f))
-    
-    def read_json(self, path):
-        """Read a JSON file."""
-        full = self.output_dir / path
-        if not full.exists():
-            return None
-        with open(full, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-# 瀹炰緥鍖栧伐鍏?
-gate_data = ETCGateData()
-
-# ===== 棰勫姞杞界殑浠跨湡鏁版嵁 =====
-sim_data = {sim_data_json}
-sim_config = sim_data.get("config", {{}}) if sim_data else None
-sim_gates = sim_data.get("etcGates", []) if sim_data else None
-sim_stats = sim_data.get("statistics", {{}}) if sim_data else None
-
-# ===== 鐢ㄦ埛鑴氭湰寮€濮?=====
-{req.code}
-'''
-    
-    try:
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False, encoding="utf-8") as tmp:
-            tmp.write(full_script)
-            tmp_path = tmp.name
-        
-        result = subprocess.run(
-            [sys.executable if hasattr(sys, 'executable') else "python", tmp_path],
-            capture_output=True,
-            text=True,
+    if _FORK_CTX is not None:
+        # 在 fork-server 派生的子进程中直接执行，无解释器冷启动
+        user_globals = {
+            "__name__": "__main__",
+            "OUTPUT_DIR": str(data_dir),
+            "sim_data_path": sim_data_path,
+        }
+        stdout, stderr, returncode = await _run_forked(
+            _FORK_PRELUDE + req.code + "\n",
+            user_globals,
             timeout=req.timeout,
+            max_output=None,
             cwd=str(ETC_SIM_DIR),
         )
-        
-        return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode,
-        }
-    except subprocess.TimeoutExpired:
-        return {"stdout": "", "stderr": f"鈴?鑴氭湰鎵ц瓒呮椂 ({req.timeout}s)", "returncode": -1}
-    except Exception as e:
-        return {"stdout": "", "stderr": str(e), "returncode": -1}
-    finally:
-        try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
+    else:
+        # 脚本经 stdin 交给 python - 异步执行；repr() 生成合法的路径字面量
+        full_script = (
+            f"OUTPUT_DIR = {str(data_dir)!r}\nsim_data_path = {sim_data_path!r}\n"
+            + _SUBPROCESS_PRELUDE + req.code + "\n"
+        )
+        stdout, stderr, returncode = await _run_process(
+            [sys.executable or "python", "-"],
+            timeout=req.timeout,
+            cwd=str(ETC_SIM_DIR),
+            input_data=full_script.encode("utf-8"),
+        )
+    # 脚本可能原地覆写数据目录中的文件 (目录 mtime 不变)，失效相关列表缓存
+    invalidate_tree_listings(data_dir)
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "returncode": returncode,
+    }
 
 
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
+from collections import OrderedDict
+import asyncio
 import os
-import json
 import shutil
+import tempfile
+import threading
 import traceback
 import logging
 
@@ -13,7 +16,9 @@ from ...models.alert_ml_predictor import TimeSeriesPredictor
 from ...models.ml_feature_extractor import TimeSeriesFeatureExtractor
 from ...models.etc_anomaly_detector import ETCTransaction
 from ...models.alert_evaluator import GroundTruthEvent
-from ..services.run_repository import list_runs as list_history_runs
+from ..services.dir_index import TreeListing, invalidate_tree_listings
+from ..services.json_io import dumps as json_dumps, loads as json_loads, read_json, scan_json, write_json
+from ..services.run_repository import ML_DATASET_SIDECAR_SUFFIX, list_runs as list_history_runs
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/prediction", tags=["prediction"])
@@ -38,49 +43,93 @@ def _collect_source_names(file_names: Optional[List[str]] = None, run_ids: Optio
     return ordered
 
 
+def _scan_name_index(path: str, dir_mtimes: dict, index: dict) -> dict:
+    """递归收集 {条目名: Path}，同名时保留先访问到的 (与 rglob 的先序遍历一致)，不跟随目录符号链接"""
+    try:
+        dir_mtimes[path] = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return index
+    subdirs = []
+    for entry in entries:
+        index.setdefault(entry.name, Path(entry.path))
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+        except OSError:
+            pass
+    for sub in subdirs:
+        _scan_name_index(sub, dir_mtimes, index)
+    return index
+
+
+# 仿真结果 / 数据集目录的文件名索引，替代每次请求的 rglob 全树遍历
+_result_names = TreeListing(RESULTS_DIR, lambda dir_mtimes: _scan_name_index(str(RESULTS_DIR), dir_mtimes, {}))
+_dataset_names = TreeListing(DATASETS_DIR, lambda dir_mtimes: _scan_name_index(str(DATASETS_DIR), dir_mtimes, {}))
+
+
+def _find_by_name(names: TreeListing, name: str) -> Optional[Path]:
+    """在目录树中按名称查找；名称含路径分隔符或通配符时退回 rglob"""
+    if not name:
+        return None
+    if any(c in name for c in "/\\*?["):
+        return next(names.root.rglob(name), None)
+    return names.get().get(name)
+
+
+def _first_existing(*paths: Path) -> Optional[Path]:
+    """返回第一个存在的候选路径；调用方随后直接打开，文件在此期间被删除时由 FileNotFoundError 处理"""
+    for path in paths:
+        if path.exists():
+            return path
+    return None
+
+
 def _resolve_source_path(source_name: str) -> Optional[Path]:
-    candidates = [
+    found = _first_existing(
         DATASETS_DIR / source_name,
         DATASETS_DIR / f"{source_name}.json",
         RESULTS_DIR / source_name / "data.json",
         RESULTS_DIR / source_name,
         RESULTS_DIR / f"{source_name}.json",
-    ]
-    for candidate in candidates:
-        if candidate.exists():
-            return candidate
-
-    found = list(DATASETS_DIR.rglob(source_name))
-    if found:
-        return found[0]
-
-    found = list(RESULTS_DIR.rglob(source_name))
-    if found:
-        return found[0]
-
-    if not source_name.endswith('.json'):
-        found = list(RESULTS_DIR.rglob(f"{source_name}.json"))
-        if found:
-            return found[0]
+    )
+    if found is not None:
+        return found
 
-    return None
+    found = _find_by_name(_dataset_names, source_name) or _find_by_name(_result_names, source_name)
+    if found is None and not source_name.endswith('.json'):
+        found = _find_by_name(_result_names, f"{source_name}.json")
+    return found
 
 
-def _load_source_result_payload(source_name: str) -> dict:
+def _resolve_source_result_path(source_name: str) -> Optional[Path]:
+    """训练来源对应的仿真结果文件；来源是 datasets/ 下的数据集时返回 None (不含速度历史)"""
     source_path = _resolve_source_path(source_name)
-    if not source_path or not source_path.exists():
-        return {}
+    if source_path is None:
+        return None
 
     if source_path.is_dir():
         source_path = source_path / 'data.json'
-    if not source_path.exists() or source_path.parent == DATASETS_DIR:
-        return {}
+    if source_path.parent == DATASETS_DIR:
+        return None
+    return source_path
 
+
+def _write_json_file(path: Path, content: bytes):
+    """原子写入已序列化的 JSON (先写同目录临时文件再 os.replace)，并发写同一文件时不会交错"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
     try:
-        with open(source_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
-    except Exception:
-        return {}
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认 0600
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 # ============================================
@@ -119,30 +168,96 @@ def _rebuild_ml_dataset(data: dict,
     return dataset
 
 
-def _load_ml_dataset_from_file(file_path: Path,
-                                step_seconds: float = 60.0,
-                                window_size_steps: int = 5,
-                                extra_features: List[str] = None,
-                                force_rebuild: bool = False,
-                                custom_expressions: List[str] = None) -> dict:
+def _ml_dataset_sidecar(file_path: Path) -> Path:
+    """重建 ml_dataset 的缓存文件，与结果文件同目录 (如 data.json -> data.ml_dataset.json)"""
+    return file_path.with_suffix(ML_DATASET_SIDECAR_SUFFIX)
+
+
+def _fresh_sidecar(file_path: Path) -> Optional[Path]:
+    """返回不早于结果文件的 sidecar 路径；不存在或结果文件已更新时返回 None"""
+    sidecar = _ml_dataset_sidecar(file_path)
+    try:
+        if sidecar.stat().st_mtime_ns >= file_path.stat().st_mtime_ns:
+            return sidecar
+    except OSError:
+        pass
+    return None
+
+
+# 源仿真的图表上下文 {(路径, mtime_ns, size): (segment_speed_history, anomaly_logs)}，LRU。
+# 重建 ml_dataset 时已整体解析过结果文件，顺带记下这两个字段，返回 test_context 时无需再解析一遍
+_SOURCE_CONTEXT_KEYS = ("segment_speed_history", "anomaly_logs")
+_SOURCE_CONTEXT_CACHE_SIZE = 4
+_source_context_cache: "OrderedDict[tuple, Tuple[list, list]]" = OrderedDict()
+_source_context_cache_lock = threading.Lock()
+
+
+def _remember_source_context(key: tuple, data: dict) -> Tuple[list, list]:
+    context = tuple(data.get(k) or [] for k in _SOURCE_CONTEXT_KEYS)
+    with _source_context_cache_lock:
+        _source_context_cache[key] = context
+        _source_context_cache.move_to_end(key)
+        while len(_source_context_cache) > _SOURCE_CONTEXT_CACHE_SIZE:
+            _source_context_cache.popitem(last=False)
+    return context
+
+
+def _read_source_context(path: Path) -> Tuple[list, list]:
+    """读取结果文件的 (segment_speed_history, anomaly_logs)；未命中缓存时只流式提取这两个字段 (返回值调用方不得修改)"""
+    try:
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        with _source_context_cache_lock:
+            cached = _source_context_cache.get(key)
+            if cached is not None:
+                _source_context_cache.move_to_end(key)
+                return cached
+        values, _ = scan_json(path, keep=_SOURCE_CONTEXT_KEYS)
+        return _remember_source_context(key, values)
+    except Exception:
+        return [], []
+
+
+def _build_ml_dataset_from_file(file_path: Path,
+                                 step_seconds: float = 60.0,
+                                 window_size_steps: int = 5,
+                                 extra_features: List[str] = None,
+                                 force_rebuild: bool = False,
+                                 custom_expressions: List[str] = None) -> dict:
     """
     从仿真结果 JSON 文件中加载或重建 ml_dataset。
     如果用户指定了自定义参数或额外特征，则强制重建。
+    默认参数下的重建结果缓存在 sidecar 文件中，命中时无需解析 (可能很大的) 结果文件；
+    sidecar 记录写入时的 DATASET_VERSION，提取逻辑更新后自动失效，force_rebuild 时不使用。
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    # 如果用户指定了自定义参数，强制重建
+    has_custom_params = (step_seconds != 60.0 or window_size_steps != 5 or bool(extra_features) or bool(custom_expressions))
+
+    sidecar = None if has_custom_params or force_rebuild else _fresh_sidecar(file_path)
+    if sidecar is not None:
+        try:
+            cached = read_json(sidecar)
+            version = cached.pop("extractor_version", None)
+            if version == TimeSeriesFeatureExtractor.DATASET_VERSION and cached.get("samples"):
+                logger.info(f"使用 ml_dataset 缓存 {sidecar.name} ({len(cached['samples'])} samples)")
+                return cached
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"读取 ml_dataset 缓存失败: {e}")
+
+    st = file_path.stat()
+    data = read_json(file_path)
 
     # 如果这个文件本身就是一个直接提取好的 ml_dataset 数据集 (格式为 {"metadata": {...}, "samples": [...]})
     if "samples" in data and "metadata" in data and isinstance(data["samples"], list):
         logger.info(f"识别到这是一个独立的特征数据集文件，直接加载 ({len(data['samples'])} samples)")
         return data
 
+    _remember_source_context((str(file_path), st.st_mtime_ns, st.st_size), data)
+
+    # 旧版本会把重建结果回写进结果文件，仍兼容读取
     ml_dataset = data.get("ml_dataset", {})
     samples = ml_dataset.get("samples", [])
 
-    # 如果用户指定了自定义参数，强制重建
-    has_custom_params = (step_seconds != 60.0 or window_size_steps != 5 or bool(extra_features) or bool(custom_expressions))
-    
     if samples and not has_custom_params and not force_rebuild:
         logger.info(f"直接使用已有 ml_dataset ({len(samples)} samples)")
         return ml_dataset
@@ -153,19 +268,103 @@ def _load_ml_dataset_from_file(file_path: Path,
     ml_dataset = _rebuild_ml_dataset(data, step_seconds, window_size_steps, extra_features, custom_expressions)
     rebuilt_samples = ml_dataset.get("samples", [])
 
-    # 仅在默认参数且成功时回写缓存
+    # 仅在默认参数且成功时写入 sidecar 缓存 (不再改写整个结果文件)
     if rebuilt_samples and not has_custom_params:
-        data["ml_dataset"] = ml_dataset
+        sidecar = _ml_dataset_sidecar(file_path)
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logger.info(f"已将重建的 ml_dataset ({len(rebuilt_samples)} samples) 回写到文件")
+            _write_json_file(sidecar, json_dumps(
+                {**ml_dataset, "extractor_version": TimeSeriesFeatureExtractor.DATASET_VERSION}
+            ))
+            invalidate_tree_listings(sidecar)
+            logger.info(f"已将重建的 ml_dataset ({len(rebuilt_samples)} samples) 缓存到 {sidecar.name}")
         except Exception as e:
-            logger.warning(f"回写 ml_dataset 失败: {e}")
+            logger.warning(f"写入 ml_dataset 缓存失败: {e}")
 
     return ml_dataset
 
 
+# ml_dataset 内存缓存 {(路径, mtime_ns, size, 提取参数...): ml_dataset}，LRU。
+# 自定义参数的重建结果不落盘，反复训练/提取同一批文件时直接复用；单个数据集可能较大，条目数从严
+_ML_DATASET_CACHE_SIZE = 4
+_ml_dataset_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+_ml_dataset_cache_lock = threading.Lock()
+
+
+def _load_ml_dataset_from_file(file_path: Path,
+                                step_seconds: float = 60.0,
+                                window_size_steps: int = 5,
+                                extra_features: List[str] = None,
+                                force_rebuild: bool = False,
+                                custom_expressions: List[str] = None) -> dict:
+    """带缓存的 _build_ml_dataset_from_file，文件 mtime/size 变化后自动失效 (返回值调用方不得修改)"""
+    st = file_path.stat()
+    key = (
+        str(file_path), st.st_mtime_ns, st.st_size, step_seconds, window_size_steps,
+        tuple(extra_features or ()), force_rebuild, tuple(custom_expressions or ()),
+    )
+    with _ml_dataset_cache_lock:
+        cached = _ml_dataset_cache.get(key)
+        if cached is not None:
+            _ml_dataset_cache.move_to_end(key)
+            return cached
+
+    ml_dataset = _build_ml_dataset_from_file(
+        file_path, step_seconds, window_size_steps, extra_features, force_rebuild, custom_expressions
+    )
+    with _ml_dataset_cache_lock:
+        _ml_dataset_cache[key] = ml_dataset
+        while len(_ml_dataset_cache) > _ML_DATASET_CACHE_SIZE:
+            _ml_dataset_cache.popitem(last=False)
+    return ml_dataset
+
+
+# 同时加载的来源数上限：每个来源都可能整体解析一个大结果文件，并发过多会抬高峰值内存
+_MAX_PARALLEL_LOADS = 4
+
+
+async def _load_ml_datasets(source_names: List[str], **load_kwargs) -> List[dict]:
+    """在线程池中并发加载各来源的 ml_dataset，结果与 source_names 同序；找不到的来源跳过"""
+    semaphore = asyncio.Semaphore(_MAX_PARALLEL_LOADS)
+
+    async def load(source_name: str) -> Optional[dict]:
+        async with semaphore:
+            file_path = await asyncio.to_thread(_resolve_source_path, source_name)
+            if file_path is not None:
+                try:
+                    return await asyncio.to_thread(_load_ml_dataset_from_file, file_path, **load_kwargs)
+                except FileNotFoundError:
+                    pass
+        logger.warning(f"??????: {source_name}")
+        return None
+
+    results = await asyncio.gather(*(load(name) for name in source_names))
+    return [ml_dataset for ml_dataset in results if ml_dataset is not None]
+
+
+def _find_source_result_path(source_file: str) -> Optional[Path]:
+    return _first_existing(RESULTS_DIR / source_file / "data.json", RESULTS_DIR / source_file) \
+        or _find_by_name(_result_names, source_file)
+
+
+async def _load_source_contexts(source_files: List[str], resolve=_find_source_result_path) -> Tuple[list, list]:
+    """在线程池中并发读取各源仿真的速度历史与异常日志，按 source_files 顺序拼接；找不到或无法解析的跳过"""
+    semaphore = asyncio.Semaphore(_MAX_PARALLEL_LOADS)
+
+    def read(source_file: str) -> Tuple[list, list]:
+        path = resolve(source_file)
+        return _read_source_context(path) if path is not None else ([], [])
+
+    async def load(source_file: str) -> Tuple[list, list]:
+        async with semaphore:
+            return await asyncio.to_thread(read, source_file)
+
+    all_speeds, all_anomalies = [], []
+    for speeds, anomalies in await asyncio.gather(*(load(sf) for sf in source_files)):
+        all_speeds.extend(speeds)
+        all_anomalies.extend(anomalies)
+    return all_speeds, all_anomalies
+
+
 # ============================================
 # 训练 API
 # ============================================
@@ -188,19 +387,13 @@ async def train_model(request: TrainingRequest):
         metadata = {}
         source_names = _collect_source_names(request.file_names, request.run_ids)
 
-        for source_name in source_names:
-            file_path = _resolve_source_path(source_name)
-            if file_path is None or not file_path.exists():
-                logger.warning(f"??????: {source_name}")
-                continue
-
-            ml_dataset = _load_ml_dataset_from_file(
-                file_path,
-                step_seconds=request.step_seconds,
-                window_size_steps=request.window_size_steps,
-                extra_features=request.selected_features or None,
-            )
-
+        ml_datasets = await _load_ml_datasets(
+            source_names,
+            step_seconds=request.step_seconds,
+            window_size_steps=request.window_size_steps,
+            extra_features=request.selected_features or None,
+        )
+        for ml_dataset in ml_datasets:
             if not metadata and ml_dataset.get("metadata"):
                 metadata = ml_dataset["metadata"]
 
@@ -218,16 +411,19 @@ async def train_model(request: TrainingRequest):
             "samples": combined_samples,
         }
 
-        global current_predictor
-        current_predictor = TimeSeriesPredictor()
+        # 训练到局部实例，成功后才替换全局模型，训练期间 /evaluate 等仍使用原模型
+        predictor = TimeSeriesPredictor()
         params = {
             "n_estimators": request.hyperparameters.get("n_estimators", 100),
             "max_depth": request.hyperparameters.get("max_depth", 10),
         }
-        result = current_predictor.train(final_dataset, params=params)
+        result = await asyncio.to_thread(predictor.train, final_dataset, params=params)
         if result.get("status") == "error":
             raise HTTPException(status_code=400, detail=result.get("message"))
 
+        global current_predictor
+        current_predictor = predictor
+
         from datetime import datetime
 
         primary_name = source_names[0] if source_names else 'unknown'
@@ -238,7 +434,7 @@ async def train_model(request: TrainingRequest):
 
         source_files = metadata.get("source_files", []) or source_names
         try:
-            current_predictor.save_model(str(model_path))
+            await asyncio.to_thread(predictor.save_model, str(model_path))
             meta = {
                 "model_id": model_id,
                 "created_at": datetime.now().isoformat(),
@@ -257,19 +453,13 @@ async def train_model(request: TrainingRequest):
                 "validated_samples": result["samples_validated"],
             }
             meta_path = MODELS_DIR / f"{model_id}.meta.json"
-            with open(meta_path, "w", encoding="utf-8") as meta_file:
-                json.dump(meta, meta_file, indent=2, ensure_ascii=False)
+            write_json(meta_path, meta, indent=True)
+            _model_listing.invalidate()
         except Exception as save_err:
             logger.warning(f"??????: {save_err}")
             model_id = None
 
-        all_speeds = []
-        all_anomalies = []
-        for source_name in source_files:
-            payload = _load_source_result_payload(source_name)
-            if payload:
-                all_speeds.extend(payload.get("segment_speed_history", []))
-                all_anomalies.extend(payload.get("anomaly_logs", []))
+        all_speeds, all_anomalies = await _load_source_contexts(source_files, _resolve_source_result_path)
 
         predict_results = result["metrics"].pop("test_details", [])
         return {
@@ -310,53 +500,37 @@ async def evaluate_on_file(request: EvaluationRequest):
         
     try:
         # 尝试查找文件：先从 datasets/ 查，再从 simulations/ 查
-        file_path = DATASETS_DIR / (request.file_name if request.file_name.endswith('.json') else request.file_name + '.json')
-        if not file_path.exists():
-            file_path = RESULTS_DIR / request.file_name / "data.json"
-        if not file_path.exists():
-            file_path = RESULTS_DIR / request.file_name
-        if not file_path.exists():
-            found = list(RESULTS_DIR.rglob(request.file_name))
-            file_path = found[0] if found else None
+        file_path = _first_existing(
+            DATASETS_DIR / (request.file_name if request.file_name.endswith('.json') else request.file_name + '.json'),
+            RESULTS_DIR / request.file_name / "data.json",
+            RESULTS_DIR / request.file_name,
+        ) or _find_by_name(_result_names, request.file_name)
         
-        if file_path is None or not file_path.exists():
+        if file_path is None:
             raise HTTPException(status_code=404, detail="测试文件不存在")
             
-        ml_dataset = _load_ml_dataset_from_file(file_path)
+        try:
+            ml_dataset = await asyncio.to_thread(_load_ml_dataset_from_file, file_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="测试文件不存在")
             
-        X, y, info = current_predictor._prepare_data(ml_dataset)
+        X, y, info = await asyncio.to_thread(current_predictor._prepare_data, ml_dataset)
         
         if len(X) == 0:
             raise HTTPException(status_code=400, detail="测试集中无有效样本")
             
-        eval_result = current_predictor.evaluate_raw(X, y, info)
+        eval_result = await asyncio.to_thread(current_predictor.evaluate_raw, X, y, info)
         
         # 提取 test_context 用于前端大屏图表
         predict_results = eval_result.pop("test_details", [])
         
         # 尝试获取源仿真的速度历史和异常日志
-        all_speeds = []
-        all_anomalies = []
         metadata = ml_dataset.get("metadata", {})
         source_files = metadata.get("source_files", [])
         if not source_files:
             source_files = [request.file_name]
         
-        for sf in source_files:
-            sf_path = RESULTS_DIR / sf / "data.json"
-            if not sf_path.exists():
-                sf_path = RESULTS_DIR / sf
-            if not sf_path.exists():
-                found = list(RESULTS_DIR.rglob(sf))
-                sf_path = found[0] if found else None
-            if sf_path and sf_path.exists():
-                try:
-                    with open(sf_path, "r", encoding="utf-8") as f:
-                        sg_data = json.load(f)
-                        all_speeds.extend(sg_data.get("segment_speed_history", []))
-                        all_anomalies.extend(sg_data.get("anomaly_logs", []))
-                except Exception:
-                    pass
+        all_speeds, all_anomalies = await _load_source_contexts(source_files)
         
         return {
             "status": "success",
@@ -386,26 +560,36 @@ async def evaluate_on_file(request: EvaluationRequest):
 @router.get("/models")
 async def list_models():
     """列出所有已保存的模型，并读取伴生的 .meta.json 提供溯源信息"""
+    return {"models": await asyncio.to_thread(_model_listing.get)}
+
+
+def _scan_models(dir_mtimes: dict) -> list:
+    # 一次 scandir 同时得到模型文件与元数据文件名，模型只 stat 一次，元数据无需 exists()
+    with os.scandir(MODELS_DIR) as it:
+        entries = list(it)
+    names = {e.name for e in entries}
     models = []
-    for f in sorted(MODELS_DIR.glob("*.joblib"), reverse=True):
-        stat = f.stat()
+    for e in sorted(entries, key=lambda e: os.path.normcase(e.name), reverse=True):
+        if not e.name.endswith(".joblib") or not e.is_file():
+            continue
+        stat = e.stat()
+        model_id = e.name[:-len(".joblib")]
         entry = {
-            "model_id": f.stem,
-            "filename": f.name,
+            "model_id": model_id,
+            "filename": e.name,
             "size": stat.st_size,
             "created_at": stat.st_mtime,
             "meta": None,
         }
         # 尝试读取元数据
-        meta_path = MODELS_DIR / f"{f.stem}.meta.json"
-        if meta_path.exists():
+        meta_name = f"{model_id}.meta.json"
+        if meta_name in names:
             try:
-                with open(meta_path, "r", encoding="utf-8") as mf:
-                    entry["meta"] = json.load(mf)
+                entry["meta"] = read_json(MODELS_DIR / meta_name)
             except Exception:
                 pass
         models.append(entry)
-    return {"models": models}
+    return models
 
 
 class LoadModelRequest(BaseModel):
@@ -421,8 +605,9 @@ async def load_model(request: LoadModelRequest):
         raise HTTPException(status_code=404, detail=f"模型文件不存在: {request.model_id}")
     
     try:
-        current_predictor = TimeSeriesPredictor()
-        current_predictor.load_model(str(model_path))
+        predictor = TimeSeriesPredictor()
+        await asyncio.to_thread(predictor.load_model, str(model_path))
+        current_predictor = predictor
         return {
             "status": "success",
             "message": f"模型 {request.model_id} 已加载到内存",
@@ -440,12 +625,25 @@ async def load_model(request: LoadModelRequest):
 async def list_simulation_results():
     """?????????????"""
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    return {"files": await asyncio.to_thread(_result_listing.get)}
+
+
+def _scan_results(dir_mtimes: dict) -> list:
     files = []
-    for run in list_history_runs(RESULTS_DIR):
+    for run in list_history_runs(RESULTS_DIR, dir_mtimes):
         run_dir = RESULTS_DIR / run["run_id"]
         data_file = run_dir / "data.json"
         size = data_file.stat().st_size if data_file.exists() else 0
         summary = run.get("summary", {})
+        ml_samples = summary.get("ml_samples", 0)
+        sidecar = _fresh_sidecar(data_file) if not ml_samples else None
+        if sidecar is not None:
+            try:
+                values, counts = scan_json(sidecar, keep=("extractor_version",), count=("samples",))
+                if values.get("extractor_version") == TimeSeriesFeatureExtractor.DATASET_VERSION:
+                    ml_samples = counts.get("samples", 0)
+            except (OSError, ValueError):
+                pass
         files.append({
             "name": run["name"],
             "path": run["path"],
@@ -456,10 +654,10 @@ async def list_simulation_results():
                 "vehicles": summary.get("total_vehicles"),
                 "anomalies": summary.get("total_anomalies"),
                 "sim_time": summary.get("simulation_time"),
-                "ml_samples": summary.get("ml_samples", 0),
+                "ml_samples": ml_samples,
             },
         })
-    return {"files": files}
+    return files
 
 
 # ============================================
@@ -484,21 +682,15 @@ async def extract_dataset(request: ExtractDatasetRequest):
         metadata = {}
         source_names = _collect_source_names(request.file_names, request.run_ids)
 
-        for source_name in source_names:
-            file_path = _resolve_source_path(source_name)
-            if file_path is None or not file_path.exists():
-                logger.warning(f"??????: {source_name}")
-                continue
-
-            ml_dataset = _load_ml_dataset_from_file(
-                file_path,
-                step_seconds=request.step_seconds,
-                window_size_steps=request.window_size_steps,
-                extra_features=request.selected_features or None,
-                force_rebuild=True,
-                custom_expressions=request.custom_expressions or None,
-            )
-
+        ml_datasets = await _load_ml_datasets(
+            source_names,
+            step_seconds=request.step_seconds,
+            window_size_steps=request.window_size_steps,
+            extra_features=request.selected_features or None,
+            force_rebuild=True,
+            custom_expressions=request.custom_expressions or None,
+        )
+        for ml_dataset in ml_datasets:
             if not metadata and ml_dataset.get("metadata"):
                 metadata = ml_dataset["metadata"]
             combined_samples.extend(ml_dataset.get("samples", []))
@@ -525,8 +717,13 @@ async def extract_dataset(request: ExtractDatasetRequest):
         }
 
         ds_path = DATASETS_DIR / f"{ds_name}.json"
-        with open(ds_path, "w", encoding="utf-8") as dataset_file:
-            json.dump(final_dataset, dataset_file, indent=2, ensure_ascii=False)
+        # 样本为大量嵌套数值数组，缩进会使文件体积近乎翻倍并拖慢之后的加载，故紧凑写出
+        await asyncio.to_thread(_write_json_file, ds_path, json_dumps(final_dataset))
+        # 元数据已在内存中，直接登记到索引，列表时无需再读取该文件
+        await asyncio.to_thread(
+            _append_dataset_index, ds_path, _dataset_meta(final_dataset["metadata"], len(combined_samples))
+        )
+        _dataset_listing.invalidate()
 
         n_features = len(metadata.get("feature_names", [])) or (6 + len(request.selected_features))
         return {
@@ -548,36 +745,104 @@ async def extract_dataset(request: ExtractDatasetRequest):
 @router.get("/datasets")
 async def list_datasets():
     """列出 data/datasets/ 下的所有已提取训练数据集"""
+    return {"datasets": await asyncio.to_thread(_dataset_listing.get)}
+
+
+# 数据集元数据索引：每行一条 {"filename", "mtime_ns", "size", "meta"}，同名以最后一条为准。
+# 提取数据集时追加，列表时只有索引中缺失或文件已变化的数据集才需要读取
+_DATASET_INDEX = DATASETS_DIR / "_index.jsonl"
+
+
+def _dataset_meta(m: dict, total_samples: int) -> dict:
+    ep = m.get("extraction_params", {})
+    return {
+        "total_samples": total_samples,
+        "feature_names": m.get("feature_names", []),
+        "step_seconds": ep.get("step_seconds"),
+        "window_size_steps": ep.get("window_size_steps"),
+        "extra_features": ep.get("extra_features", []),
+        "source_files": m.get("source_files", []),
+        "created_at": m.get("created_at"),
+    }
+
+
+def _dataset_index_record(path: Path, stat: os.stat_result, meta: dict) -> dict:
+    return {"filename": path.name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "meta": meta}
+
+
+def _append_dataset_index(path: Path, meta: dict):
+    try:
+        record = _dataset_index_record(path, path.stat(), meta)
+        with open(_DATASET_INDEX, "ab") as f:
+            f.write(json_dumps(record) + b"\n")
+    except OSError as e:
+        logger.warning(f"写入数据集索引失败: {e}")
+
+
+def _read_dataset_index() -> Tuple[Dict[str, dict], int]:
+    """返回 ({文件名: 记录}, 行数)；损坏的行 (如写入中断) 直接跳过"""
+    records = {}
+    lines = 0
+    try:
+        with open(_DATASET_INDEX, "rb") as f:
+            for line in f:
+                lines += 1
+                try:
+                    record = json_loads(line)
+                    records[record["filename"]] = record
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return records, lines
+
+
+def _scan_datasets(dir_mtimes: dict) -> list:
+    index, index_lines = _read_dataset_index()
+    records = []
     datasets = []
-    for f in sorted(DATASETS_DIR.glob("*.json"), reverse=True):
-        stat = f.stat()
-        meta = {}
-        try:
-            with open(f, "r", encoding="utf-8") as fp:
-                data = json.load(fp)
-            m = data.get("metadata", {})
-            ep = m.get("extraction_params", {})
-            meta = {
-                "total_samples": len(data.get("samples", [])),
-                "feature_names": m.get("feature_names", []),
-                "step_seconds": ep.get("step_seconds"),
-                "window_size_steps": ep.get("window_size_steps"),
-                "extra_features": ep.get("extra_features", []),
-                "source_files": m.get("source_files", []),
-                "created_at": m.get("created_at"),
-            }
-        except Exception:
-            pass
+    with os.scandir(DATASETS_DIR) as it:
+        entries = sorted(
+            (e for e in it if e.name.endswith(".json") and e.is_file()),
+            key=lambda e: os.path.normcase(e.name),
+            reverse=True,
+        )
+    for entry in entries:
+        f = Path(entry.path)
+        stat = entry.stat()
+        record = index.get(entry.name)
+        if record is None or record.get("mtime_ns") != stat.st_mtime_ns or record.get("size") != stat.st_size:
+            meta = {}
+            try:
+                # 只物化 metadata，samples 数组只计数
+                data, counts = scan_json(f, keep=("metadata",), count=("samples",))
+                meta = _dataset_meta(data.get("metadata", {}), counts.get("samples", 0))
+            except Exception:
+                pass
+            record = _dataset_index_record(f, stat, meta)
+        records.append(record)
 
         datasets.append({
             "name": f.stem,
             "filename": f.name,
             "size": stat.st_size,
             "modified": stat.st_mtime,
-            "meta": meta,
+            "meta": record["meta"],
         })
 
-    return {"datasets": datasets}
+    # 有新登记、过期或重复的记录时整体重写索引 (数据集数量有限，索引很小)
+    if index_lines != len(records) or any(index.get(r["filename"]) is not r for r in records):
+        try:
+            _write_json_file(_DATASET_INDEX, b"".join(json_dumps(r) + b"\n" for r in records))
+        except OSError as e:
+            logger.warning(f"重写数据集索引失败: {e}")
+    return datasets
+
+
+# 模型 / 仿真结果 / 数据集列表缓存，目录未变化时不再逐个读取元数据
+_model_listing = TreeListing(MODELS_DIR, _scan_models)
+_result_listing = TreeListing(RESULTS_DIR, _scan_results)
+_dataset_listing = TreeListing(DATASETS_DIR, _scan_datasets)
 
 
 # ============================================
@@ -650,11 +915,9 @@ async def rename_model(model_id: str, request: RenameRequest):
         dst_meta = MODELS_DIR / f"{new_name}.meta.json"
         if src_meta.exists():
             # 更新 meta 中的 model_id 字段
-            with open(src_meta, 'r', encoding='utf-8') as f:
-                meta = json.load(f)
+            meta = read_json(src_meta)
             meta['model_id'] = new_name
-            with open(dst_meta, 'w', encoding='utf-8') as f:
-                json.dump(meta, f, indent=2, ensure_ascii=False)
+            write_json(dst_meta, meta, indent=True)
             src_meta.unlink()
         return {"success": True, "new_model_id": new_name}
     except Exception as e:
@@ -688,11 +951,9 @@ async def copy_model(model_id: str):
     try:
         shutil.copy2(src, dst)
         if src_meta.exists():
-            with open(src_meta, "r", encoding="utf-8") as f:
-                meta = json.load(f)
+            meta = read_json(src_meta)
             meta["model_id"] = new_name
-            with open(dst_meta, "w", encoding="utf-8") as f:
-                json.dump(meta, f, indent=2, ensure_ascii=False)
+            write_json(dst_meta, meta, indent=True)
         return {"success": True, "new_model_id": new_name}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"复制失败: {e}")
@@ -16,7 +16,7 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
-from .files import OUTPUT_DIR, _get_frames_for_file
+from .files import OUTPUT_DIR, _frames_chunk_response, _get_frames_for_file
 from ..services.run_repository import (
     DATA_FILENAME,
     RUN_SCHEMA_VERSION,
@@ -288,14 +288,11 @@ async def get_run_replay_frames(
     """分页读取回放帧。"""
     run_dir = _resolve_run(run_id)
     cache = _load_run_cache(run_dir)
-    frames = cache.get('frames', [])
-    chunk = frames[offset: offset + limit]
     manifest = load_run_manifest(run_dir) or {}
     road_geometry = manifest.get('road_geometry', {})
 
-    return {
+    return _frames_chunk_response(cache, offset, limit, {
         'run_id': run_id,
-        'frames': chunk,
         'offset': offset,
         'limit': limit,
         'total_frames': cache.get('total_frames', 0),
@@ -303,7 +300,7 @@ async def get_run_replay_frames(
         'config': cache.get('config', {}) if offset == 0 else None,
         'gates': road_geometry.get('gates', []) if offset == 0 else None,
         'path_geometry': road_geometry.get('path_geometry', {}) if offset == 0 else None,
-    }
+    })
 
 
 @router.get('/{run_id}/events')
@@ -0,0 +1,27 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from etc_sim.backend.api import analysis
+
+
+def test_get_chart_data_rejects_unknown_chart_type_with_400():
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(analysis.get_chart_data("sim_001", "notAChart", None, None))
+
+    assert exc_info.value.status_code == 400
+
+
+def test_get_chart_data_returns_mock_payload_and_labels():
+    result = asyncio.run(analysis.get_chart_data("sim_001", "delay", None, None))
+
+    assert result["chart_type"] == "delay"
+    assert result["data"]["total_delay"][:2] == [150, 170]
+    assert result["config"] == {"title": "累计延误", "x_label": "路段区间", "y_label": "延误 (秒)"}
@@ -0,0 +1,32 @@
+import asyncio
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.api import code_execution
+
+
+@pytest.mark.skipif(code_execution._FORK_CTX is None, reason="forkserver unavailable")
+def test_forked_run_does_not_reimport_main(tmp_path, monkeypatch):
+    sentinel = tmp_path / "main_imported"
+    main_script = tmp_path / "server_main.py"
+    main_script.write_text(
+        f"open({str(sentinel)!r}, 'w').close()\n", encoding="utf-8"
+    )
+    fake_main = types.ModuleType("__main__")
+    fake_main.__file__ = str(main_script)
+    fake_main.__spec__ = None
+    monkeypatch.setitem(sys.modules, "__main__", fake_main)
+
+    stdout, stderr, rc = asyncio.run(
+        code_execution._run_forked("print(value * 2)", {"__name__": "__main__", "value": 21})
+    )
+
+    assert (stdout, stderr, rc) == ("42\n", "", 0)
+    assert not sentinel.exists()
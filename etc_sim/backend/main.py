@@ -15,6 +15,7 @@ from fastapi.responses import JSONResponse
 from .api import analysis, charts, configs, environment, evaluation, files, road_network, runs, simulations, websocket, workflows
 from .api import code_execution, custom_roads, data_packets, prediction
 from .core.websocket_manager import WebSocketManager
+from .services import plotter_pool
 from .services.storage import StorageService
 
 
@@ -37,6 +38,9 @@ async def lifespan(app: FastAPI):
     storage_service = StorageService()
     ws_manager = WebSocketManager(storage_service)
     app.state.ws_manager = ws_manager
+    # 先于其他后台线程启动，用户代码此后都从该单线程进程 fork
+    code_execution.start_fork_server()
+    plotter_pool.start()
 
     logger.info("Backend initialized successfully")
     yield
@@ -44,6 +48,7 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down backend...")
     if ws_manager:
         await ws_manager.shutdown()
+    plotter_pool.shutdown()
     logger.info("Backend shutdown complete")
 
 
@@ -1286,6 +1286,28 @@ import sys
 import json
 import argparse
 
+
+def render_batch(data_file: str, output_dir: str, theme: str = 'dark') -> List[str]:
+    """读取仿真数据文件并生成整批图表，返回生成的文件列表"""
+    # Log startup
+    log_debug(f"Starting plotter. File: {data_file}, Output: {output_dir}, Theme: {theme}", output_dir)
+    log_debug(f"Python: {sys.version}", output_dir)
+    log_debug(f"NumPy: {np.__version__}, Matplotlib: {matplotlib.__version__}", output_dir)
+
+    log_debug("Loading data...", output_dir)
+    with open(data_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    log_debug(f"Initializing generator with theme: {theme}...", output_dir)
+    generator = ChartGenerator(output_dir, theme=theme)
+
+    log_debug("Generating charts...", output_dir)
+    generated_files = generator.generate_all(data)
+
+    log_debug(f"Generated {len(generated_files)} files: {generated_files}", output_dir)
+    return generated_files
+
+
 if __name__ == "__main__":
     try:
         parser = argparse.ArgumentParser(description='ETC Traffic Simulation Plotter')
@@ -1295,29 +1317,7 @@ if __name__ == "__main__":
         args = parser.parse_args()
         
         output_dir = args.output_dir
-        
-        # Log startup
-        log_debug(f"Starting plotter. File: {args.data_file}, Output: {output_dir}, Theme: {args.theme}", output_dir)
-        log_debug(f"Python: {sys.version}", output_dir)
-        
-        try:
-            import numpy
-            import matplotlib
-            log_debug(f"NumPy: {numpy.__version__}, Matplotlib: {matplotlib.__version__}", output_dir)
-        except:
-            pass
-
-        log_debug("Loading data...", output_dir)
-        with open(args.data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        log_debug(f"Initializing generator with theme: {args.theme}...", output_dir)
-        generator = ChartGenerator(args.output_dir, theme=args.theme)
-        
-        log_debug("Generating charts...", output_dir)
-        generated_files = generator.generate_all(data)
-        
-        log_debug(f"Generated {len(generated_files)} files: {generated_files}", output_dir)
+        generated_files = render_batch(args.data_file, output_dir, theme=args.theme)
         
         # Print list for parser if needed (but we log mostly)
         print("Generated files:")
@@ -0,0 +1,106 @@
+"""
+/scripts/run 用户脚本的预置库
+以模块形式提供 ETCGateData 等工具，执行脚本时直接导入 (复用 .pyc)，
+不再把预置代码拼接到每个用户脚本前重新编译。
+本模块只依赖标准库 (orjson 可选)，子进程可按文件路径单独加载，无需导入 etc_sim 包。
+"""
+
+import csv
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 数据目录，由 install() 设为本次执行绑定的目录
+OUTPUT_DIR = "."
+
+# 不对用户脚本列出的内部缓存文件 (与 run_repository.ML_DATASET_SIDECAR_SUFFIX 一致)
+_HIDDEN_SUFFIXES = (".ml_dataset.json",)
+
+
+class ETCGateData:
+    """ETC gate data reader."""
+
+    def __init__(self, output_dir=None):
+        self.output_dir = Path(OUTPUT_DIR if output_dir is None else output_dir)
+
+    def list_files(self, ext=".csv"):
+        """List data files."""
+        return [
+            str(f.relative_to(self.output_dir)) for f in self.output_dir.rglob(f"*{ext}")
+            if not f.name.endswith(_HIDDEN_SUFFIXES)
+        ]
+
+    def read_csv(self, path):
+        """Read a CSV file into dict rows."""
+        full = self.output_dir / path
+        if not full.exists():
+            return []
+        with open(full, "r", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def read_csv_df(self, path):
+        """Read a CSV file into a pandas DataFrame (C parser, far faster than read_csv on large files)."""
+        import pandas as pd
+        full = self.output_dir / path
+        if not full.exists():
+            return None
+        try:
+            return pd.read_csv(full, engine="pyarrow")
+        except ImportError:
+            return pd.read_csv(full)
+
+    def read_json(self, path):
+        """Read a JSON file."""
+        full = self.output_dir / path
+        if not full.exists():
+            return None
+        with open(full, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _load_sim_data(path):
+    """读取并解析仿真数据 data.json，文件不存在或非法 JSON 时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # 可能含 NaN 等标准库才接受的字面量
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def install(namespace: dict):
+    """
+    向用户脚本的全局命名空间注入预置变量，namespace 中需已有 OUTPUT_DIR 与 sim_data_path。
+    sim_data_path 为 data.json 路径 (None 表示未绑定仿真记录)，在这里读取并解析为 sim_data。
+    会修改模块级 OUTPUT_DIR，只应在执行用户脚本的子进程中调用。
+    """
+    global OUTPUT_DIR
+    OUTPUT_DIR = namespace["OUTPUT_DIR"]
+    sim_data_path = namespace.pop("sim_data_path", None)
+    sim_data = _load_sim_data(sim_data_path) if sim_data_path else None
+    namespace.update(
+        sys=sys, os=os, json=json, csv=csv,
+        Path=Path, Counter=Counter, defaultdict=defaultdict,
+        ETCGateData=ETCGateData,
+        gate_data=ETCGateData(),
+        sim_data=sim_data,
+        # 预加载的仿真数据
+        sim_config=sim_data.get("config", {}) if sim_data else None,
+        sim_gates=sim_data.get("etcGates", []) if sim_data else None,
+        sim_stats=sim_data.get("statistics", {}) if sim_data else None,
+    )
@@ -0,0 +1,73 @@
+"""
+用户代码执行入口
+在 fork-server 派生的子进程中运行：先把 fd 1/2 重定向到临时文件再执行已编译代码，
+print 之外，os.system、subprocess 与 C 扩展直接写 fd 的输出也能一并捕获。
+本模块只依赖标准库，由 fork-server 启动时预加载。
+"""
+
+import marshal
+import os
+import sys
+import tempfile
+import traceback
+
+
+def _redirect_fd(fd: int):
+    """把 fd 重定向到匿名临时文件，返回该文件对象"""
+    capture = tempfile.TemporaryFile()
+    os.dup2(capture.fileno(), fd)
+    return capture
+
+
+def _read_capture(capture, byte_limit) -> str:
+    """读取捕获的输出 (最多 byte_limit 字节，None 表示全部)"""
+    size = os.fstat(capture.fileno()).st_size
+    if byte_limit is not None:
+        size = min(size, byte_limit)
+    return os.pread(capture.fileno(), size, 0).decode("utf-8", errors="replace")
+
+
+def run(code_bytes: bytes, user_globals: dict, conn, max_output, cwd):
+    """子进程入口：执行 marshal 序列化的代码对象，(stdout, stderr, returncode) 经 conn 返回
+
+    max_output 不为 None 时 stdout/stderr 各多保留一个字符，便于调用方识别并标注截断。
+    """
+    if cwd is not None:
+        os.chdir(cwd)
+
+    out_capture, err_capture = _redirect_fd(1), _redirect_fd(2)
+    # 行缓冲：用户 print 的内容与子进程写入 fd 的内容按实际先后交错
+    sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)
+    sys.stderr = open(2, "w", buffering=1, encoding="utf-8", errors="backslashreplace", closefd=False)
+
+    rc = 0
+    try:
+        exec(marshal.loads(code_bytes), user_globals)
+    except SystemExit as e:
+        # 与解释器退出时一致：非整数的退出码写到 stderr，返回码为 1
+        if e.code is None:
+            rc = 0
+        elif isinstance(e.code, int):
+            rc = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            rc = 1
+    except BaseException as e:
+        # 跳过本函数所在的栈帧，只展示用户代码的调用栈
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        rc = 1
+
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+
+    # UTF-8 单字符最多 4 字节，保留 4 * max_output + 4 字节即可判断是否超长
+    byte_limit = None if max_output is None else max_output * 4 + 4
+    stdout = _read_capture(out_capture, byte_limit)
+    stderr = _read_capture(err_capture, byte_limit)
+    if max_output is not None:
+        stdout, stderr = stdout[:max_output + 1], stderr[:max_output + 1]
+    conn.send((stdout, stderr, rc))
+    conn.close()
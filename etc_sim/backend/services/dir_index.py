@@ -0,0 +1,116 @@
+"""
+目录索引
+以目录 mtime 作为失效依据缓存单层目录的文件列表，
+目录未变化时文件查找只需一次目录 stat 和字典查询。
+TreeListing 将同样的思路用于递归目录的列表结果。
+"""
+
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# 所有 TreeListing 实例，供写入方按路径统一失效
+_tree_listings: "weakref.WeakSet[TreeListing]" = weakref.WeakSet()
+
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+class DirIndex:
+    """单层目录文件名索引 {文件名: Path}"""
+
+    def __init__(self, path: Path, suffixes: Iterable[str] = ()):
+        self.path = Path(path)
+        self.suffixes = tuple(suffixes)
+        self._mtime_ns = -1
+        self._entries: Dict[str, Path] = {}
+
+    def invalidate(self):
+        """强制下次访问时重新扫描 (用于 mtime 精度不足时的主动失效)"""
+        self._mtime_ns = -1
+
+    def refresh(self) -> Dict[str, Path]:
+        """目录 mtime 变化时重新 scandir，返回当前索引"""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._mtime_ns = -1
+            self._entries = {}
+            return self._entries
+
+        if mtime_ns != self._mtime_ns:
+            entries = {}
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    if self.suffixes and not entry.name.endswith(self.suffixes):
+                        continue
+                    entries[entry.name] = Path(entry.path)
+            self._entries = entries
+            self._mtime_ns = mtime_ns
+        return self._entries
+
+    def find(self, stem: str, suffixes: Iterable[str]) -> Optional[Path]:
+        """按后缀优先级查找 stem 对应的文件"""
+        entries = self.refresh()
+        for ext in suffixes:
+            path = entries.get(f"{stem}{ext}")
+            if path is not None:
+                return path
+        return None
+
+
+class TreeListing:
+    """
+    递归目录列表缓存
+    scan(dir_mtimes) 生成列表结果，并把访问到的每个目录的 mtime 记入 dir_mtimes；
+    这些目录的 mtime 均未变化时直接返回上次结果，每个目录只需一次 stat，文件无需 stat。
+    目录 mtime 只反映条目的增删与改名，原地覆写已有文件时写入方需调用 invalidate。
+    """
+
+    def __init__(self, root: Path, scan: Callable[[Dict[str, int]], Any]):
+        self.root = Path(root)
+        self._scan = scan
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._dir_mtimes: Optional[Dict[str, int]] = None
+        self._value: Any = None
+        _tree_listings.add(self)
+
+    def invalidate(self):
+        """强制下次访问时重新扫描"""
+        with self._lock:
+            self._generation += 1
+            self._dir_mtimes = None
+            self._value = None
+
+    def get(self) -> Any:
+        """返回列表结果 (调用方不得修改)"""
+        with self._lock:
+            generation = self._generation
+            dir_mtimes, value = self._dir_mtimes, self._value
+        if dir_mtimes is not None and all(_mtime_ns(p) == m for p, m in dir_mtimes.items()):
+            return value
+
+        root = str(self.root)
+        dir_mtimes = {root: _mtime_ns(root)}
+        value = self._scan(dir_mtimes)
+        with self._lock:
+            # 扫描期间被失效过则不写回，避免缓存写入前的旧结果
+            if generation == self._generation:
+                self._dir_mtimes, self._value = dir_mtimes, value
+        return value
+
+
+def invalidate_tree_listings(path) -> None:
+    """使根目录包含 path (或被 path 包含) 的所有 TreeListing 失效"""
+    path = Path(path).resolve()
+    for listing in list(_tree_listings):
+        root = listing.root.resolve()
+        if root == path or root in path.parents or path in root.parents:
+            listing.invalidate()
@@ -0,0 +1,44 @@
+"""
+带协商缓存的文件响应
+ETag/Last-Modified 由文件 stat 生成，命中 If-None-Match / If-Modified-Since 时返回 304，
+否则由 FileResponse 直接发送文件内容 (复用同一次 stat 结果)。
+"""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Union
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+
+def file_response(
+    request: Request,
+    path: Union[str, Path],
+    media_type: str,
+    filename: str = None,
+    max_age: int = 3600,
+) -> Response:
+    """返回文件响应，客户端缓存未过期时返回 304"""
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(stat.st_mtime) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers, stat_result=stat)
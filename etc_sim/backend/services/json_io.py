@@ -0,0 +1,162 @@
+"""
+JSON 读写工具
+优先使用 orjson (C 实现，直接输出 UTF-8 bytes)，未安装时回退到标准库 json。
+"""
+
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterable, Tuple
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    JSONDecodeError = orjson.JSONDecodeError
+else:
+    JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data) -> Any:
+    """解析 JSON (bytes 或 str)
+
+    orjson 不接受 NaN/Infinity 字面量，而标准库 json.dump 写出的结果文件可能包含，
+    此时回退到标准库解析 (真正非法的 JSON 仍会抛出 JSONDecodeError)。
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def _reject_constant(name: str):
+    raise ValueError(f"非标准 JSON 字面量: {name}")
+
+
+def is_strict_json(data) -> bool:
+    """data 是否为严格合法的 JSON (不含 NaN/Infinity 字面量)，即可原样拼接进响应体"""
+    if orjson is not None:
+        try:
+            orjson.loads(data)
+            return True
+        except orjson.JSONDecodeError:
+            return False
+    try:
+        json.loads(data, parse_constant=_reject_constant)
+        return True
+    except ValueError:
+        return False
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 JSON bytes，indent=True 时缩进 2 空格"""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else _ORJSON_OPTIONS
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+# 不小于该大小的文件经 mmap 交给 orjson 解析，不再额外分配与文件等大的 bytes
+_MMAP_MIN_BYTES = 8 * 1024 * 1024
+
+
+def read_json(path) -> Any:
+    """读取并解析 JSON 文件"""
+    with open(path, "rb") as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= _MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return loads(view)
+        return loads(f.read())
+
+
+def write_json(path, obj: Any, indent: bool = False):
+    """将对象写入 JSON 文件"""
+    with open(path, "wb") as f:
+        f.write(dumps(obj, indent=indent))
+
+
+def json_response(obj: Any, status_code: int = 200) -> Response:
+    """直接返回序列化好的 JSON 响应，跳过 response_model 校验与 jsonable_encoder"""
+    return Response(content=dumps(obj), status_code=status_code, media_type="application/json")
+
+
+# 小于该大小的文件直接整体解析 (orjson 远快于逐事件流式解析)，更大的文件才流式读取以控制内存
+_STREAM_MIN_BYTES = 8 * 1024 * 1024
+
+_ITEM_START_EVENTS = frozenset(("start_map", "start_array", "string", "number", "boolean", "null"))
+
+
+def scan_json(path, keep: Iterable[str] = (), count: Iterable[str] = ()) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    流式扫描 JSON 文件，只物化需要的顶层字段，其余数组只计数。
+    keep: 需要完整读取的顶层键；count: 需要统计长度的顶层数组键 ("" 表示顶层本身是数组)。
+    返回 (values, counts)；缺失的键或非数组的计数项不出现在结果中。
+    无需计数时，所有 keep 键读取完毕即停止，不再扫描文件剩余部分。
+    文件较小或未安装 ijson 时回退为整体解析。
+    """
+    keep = set(keep)
+    count = set(count)
+
+    if ijson is not None and os.path.getsize(path) >= _STREAM_MIN_BYTES:
+        try:
+            return _scan_json_stream(path, keep, count)
+        except ijson.JSONError:
+            # 含 NaN 等 ijson 不支持的字面量时退回整体解析
+            pass
+
+    data = read_json(path)
+    values, counts = {}, {}
+    if isinstance(data, dict):
+        values = {k: data[k] for k in keep if k in data}
+        counts = {k: len(data[k]) for k in count if k and isinstance(data.get(k), list)}
+    elif isinstance(data, list) and "" in count:
+        counts[""] = len(data)
+    return values, counts
+
+
+def _scan_json_stream(path, keep: set, count: set) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """scan_json 的 ijson 逐事件实现"""
+    item_prefixes = {(f"{k}.item" if k else "item"): k for k in count}
+    values: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+    builder = None
+    building = None
+    with open(path, "rb") as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix in count and event == "start_array":
+                counts[prefix] = 0
+            key = item_prefixes.get(prefix)
+            if key in counts and event in _ITEM_START_EVENTS:
+                counts[key] += 1
+
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == building and event in ("end_map", "end_array"):
+                    values[building] = builder.value
+                    builder = building = None
+                    if not count and len(values) == len(keep):
+                        break
+            elif prefix in keep:
+                if event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    building = prefix
+                elif event != "map_key":
+                    values[prefix] = value
+                    if not count and len(values) == len(keep):
+                        break
+    return values, counts
@@ -0,0 +1,63 @@
+"""
+绘图工作进程池
+常驻的 spawn 进程池，工作进程启动时导入 plotter (matplotlib/numpy)，
+后续批次直接复用，避免每次请求冷启动解释器。
+API 主进程本身不导入 plotter.py。
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PLOTTER_WORKERS = int(os.getenv("PLOTTER_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker():
+    """工作进程初始化：预先导入绘图模块"""
+    from .. import plotter  # noqa: F401
+
+
+def _render(data_file: str, output_dir: str, theme: str) -> list:
+    from .. import plotter
+    return plotter.render_batch(data_file, output_dir, theme=theme)
+
+
+def start():
+    """创建进程池 (工作进程在首次提交时按需启动)"""
+    global _pool
+    if _pool is not None:
+        return
+    _pool = ProcessPoolExecutor(
+        max_workers=PLOTTER_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+    logger.info("Plotter pool started with %d workers", PLOTTER_WORKERS)
+
+
+def submit(data_file: str, output_dir: str, theme: str) -> Optional[Future]:
+    """提交一批图表任务；进程池不可用时返回 None，由调用方回退到子进程"""
+    global _pool
+    if _pool is None:
+        return None
+    try:
+        return _pool.submit(_render, data_file, output_dir, theme)
+    except (BrokenProcessPool, RuntimeError) as e:
+        logger.warning("Plotter pool unavailable, falling back to subprocess: %s", e)
+        _pool = None
+        return None
+
+
+def shutdown():
+    """关闭进程池"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -8,17 +8,26 @@ import json
 import math
 from datetime import datetime
 from pathlib import Path
+from stat import S_ISDIR
 from typing import Any, List, Optional
 
+from .json_io import read_json
+
 
 RUN_SCHEMA_VERSION = "run_v2_path"
 MANIFEST_FILENAME = "manifest.json"
 SUMMARY_FILENAME = "summary.json"
 DATA_FILENAME = "data.json"
+# 重建 ml_dataset 的缓存文件后缀 (data.json -> data.ml_dataset.json)，属于内部缓存，不出现在文件列表中
+ML_DATASET_SIDECAR_SUFFIX = ".ml_dataset.json"
 
 ETC_SIM_DIR = Path(__file__).resolve().parents[2]
 ROAD_MAP_DIR = ETC_SIM_DIR / "data" / "road_map"
 
+# 旧格式运行 (无 summary/manifest) 由 data.json 推导出的摘要: {data.json 路径: (mtime_ns, size, summary)}
+# data.json 可能很大，未变化时不再重复解析
+_legacy_summary_cache: dict = {}
+
 
 def _safe_float(value: Any, default: float) -> float:
     try:
@@ -360,7 +369,7 @@ def persist_run_metadata(sim_dir: Path, simulation_id: str, results_data: dict)
 def resolve_run_dir(simulations_dir: Path, run_id: str) -> Path:
     """Resolve a run directory while keeping the path inside the simulations root."""
     run_dir = (simulations_dir / run_id).resolve()
-    if not str(run_dir).startswith(str(simulations_dir.resolve())):
+    if not run_dir.is_relative_to(simulations_dir.resolve()):
         raise ValueError("Run path escapes simulations directory")
     return run_dir
 
@@ -369,8 +378,7 @@ def load_json_file(path: Path) -> Optional[dict]:
     if not path.exists():
         return None
     try:
-        with open(path, "r", encoding="utf-8") as file:
-            return json.load(file)
+        return read_json(path)
     except (OSError, json.JSONDecodeError):
         return None
 
@@ -383,34 +391,54 @@ def load_run_summary(run_dir: Path) -> Optional[dict]:
     summary = load_json_file(run_dir / SUMMARY_FILENAME)
     if summary:
         return summary
+    return _fallback_run_summary(run_dir, load_run_manifest(run_dir))
+
 
-    manifest = load_run_manifest(run_dir)
+def _fallback_run_summary(run_dir: Path, manifest: Optional[dict]) -> Optional[dict]:
+    """缺少 summary.json 时依次由 manifest、data.json 推导摘要"""
     if manifest:
         return _summary_from_manifest(run_dir, manifest)
 
-    data = load_json_file(run_dir / DATA_FILENAME)
-    if not data:
+    data_path = run_dir / DATA_FILENAME
+    try:
+        stat = data_path.stat()
+    except OSError:
         return None
+    cache_key = str(data_path)
+    cached = _legacy_summary_cache.get(cache_key)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    data = load_json_file(data_path)
+    summary = build_run_summary(run_dir.name, data) if data else None
+    _legacy_summary_cache[cache_key] = (stat.st_mtime_ns, stat.st_size, summary)
+    return summary
 
-    return build_run_summary(run_dir.name, data)
 
+def list_runs(simulations_dir: Path, dir_mtimes: Optional[dict] = None) -> List[dict]:
+    """List stored runs with fast paths for new metadata and fallback for legacy data.
 
-def list_runs(simulations_dir: Path) -> List[dict]:
-    """List stored runs with fast paths for new metadata and fallback for legacy data."""
+    dir_mtimes, when given, receives the mtime of every run directory visited (see TreeListing).
+    """
     if not simulations_dir.exists():
         return []
 
     runs: List[dict] = []
     for run_dir in sorted(simulations_dir.iterdir(), reverse=True):
-        if not run_dir.is_dir():
+        try:
+            stat = run_dir.stat()
+        except OSError:
+            continue
+        if not S_ISDIR(stat.st_mode):
             continue
+        if dir_mtimes is not None:
+            dir_mtimes[str(run_dir)] = stat.st_mtime_ns
 
-        summary = load_run_summary(run_dir)
         manifest = load_run_manifest(run_dir)
+        summary = load_json_file(run_dir / SUMMARY_FILENAME) or _fallback_run_summary(run_dir, manifest)
         if not summary:
             continue
 
-        stat = run_dir.stat()
         runs.append(
             {
                 "run_id": run_dir.name,
@@ -10,6 +10,7 @@ from datetime import datetime
 import logging
 from pathlib import Path
 
+from etc_sim.backend.services.dir_index import invalidate_tree_listings
 from etc_sim.backend.services.trajectory_storage import TrajectoryStorage
 from etc_sim.backend.services.run_repository import list_runs as list_saved_runs, persist_run_metadata
 
@@ -118,6 +119,8 @@ class StorageService:
             json.dump(results_data, f, indent=2, ensure_ascii=False, cls=NumpyEncoder)
 
         persist_run_metadata(Path(sim_dir), simulation_id, results_data)
+        # 同一 simulation_id 重复保存时为原地覆写，目录 mtime 不变
+        invalidate_tree_listings(sim_dir)
         
         return filepath
     
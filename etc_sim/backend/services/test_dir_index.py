@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.services.dir_index import DirIndex, TreeListing, invalidate_tree_listings
+
+
+def test_find_respects_suffix_priority_and_filter(tmp_path):
+    (tmp_path / "trajectory.gif").write_bytes(b"gif")
+    (tmp_path / "trajectory.png").write_bytes(b"png")
+    (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    index = DirIndex(tmp_path, (".png", ".gif"))
+
+    assert index.find("trajectory", (".png", ".gif")) == tmp_path / "trajectory.png"
+    assert "notes.txt" not in index.refresh()
+
+
+def test_invalidate_picks_up_new_files(tmp_path):
+    index = DirIndex(tmp_path)
+    assert index.refresh() == {}
+
+    (tmp_path / "speed_heatmap.png").write_bytes(b"png")
+    index.invalidate()
+
+    assert index.find("speed_heatmap", (".png",)) == tmp_path / "speed_heatmap.png"
+
+
+def test_missing_directory_yields_empty_index(tmp_path):
+    index = DirIndex(tmp_path / "missing")
+
+    assert index.refresh() == {}
+    assert index.find("anything", (".png",)) is None
+
+
+def test_tree_listing_tracks_nested_directories(tmp_path):
+    (tmp_path / "run").mkdir()
+    calls = []
+
+    def scan(dir_mtimes):
+        calls.append(1)
+        for path in (tmp_path, tmp_path / "run"):
+            dir_mtimes[str(path)] = path.stat().st_mtime_ns
+        return sorted(p.name for p in tmp_path.rglob("*"))
+
+    listing = TreeListing(tmp_path, scan)
+    assert listing.get() == ["run"]
+    assert listing.get() == ["run"] and len(calls) == 1
+
+    (tmp_path / "run" / "data.json").write_text("{}", encoding="utf-8")
+    assert listing.get() == ["data.json", "run"] and len(calls) == 2
+
+    # 原地覆写不改变目录 mtime，需由写入方按路径失效
+    (tmp_path / "run" / "data.json").write_text("{\"a\": 1}", encoding="utf-8")
+    invalidate_tree_listings(tmp_path / "run" / "data.json")
+    listing.get()
+    assert len(calls) == 3
+
+
+def test_tree_listing_reports_in_place_overwrite_after_invalidation(tmp_path):
+    (tmp_path / "run").mkdir()
+    target = tmp_path / "run" / "gate.csv"
+    target.write_text("a\n", encoding="utf-8")
+
+    def scan(dir_mtimes):
+        for path in (tmp_path, tmp_path / "run"):
+            dir_mtimes[str(path)] = path.stat().st_mtime_ns
+        return {p.name: p.stat().st_size for p in tmp_path.rglob("*.csv")}
+
+    listing = TreeListing(tmp_path, scan)
+    assert listing.get() == {"gate.csv": 2}
+
+    target.write_text("a,b,c\n", encoding="utf-8")
+    invalidate_tree_listings(tmp_path / "run")
+    assert listing.get() == {"gate.csv": 6}
@@ -0,0 +1,86 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.services import json_io
+
+
+def test_scan_json_keeps_selected_fields_and_counts_arrays(tmp_path, monkeypatch):
+    target = tmp_path / "data.json"
+    target.write_text(json.dumps({
+        "config": {"total_vehicles": 3, "segment_boundaries": [0, 2.5]},
+        "anomaly_logs": [{"id": 1, "time": 10.0}, {"id": 2, "time": 20.0}],
+        "trajectory_data": [{"item": 1}, [1, 2], 3, None],
+        "frames": {"item": []},
+    }), encoding="utf-8")
+    keep = ("config", "anomaly_logs")
+    count = ("trajectory_data", "frames", "finished_vehicles")
+    monkeypatch.setattr(json_io, "_STREAM_MIN_BYTES", 0)
+
+    values, counts = json_io.scan_json(target, keep, count)
+
+    assert values["config"]["segment_boundaries"] == [0, 2.5]
+    assert [log["id"] for log in values["anomaly_logs"]] == [1, 2]
+    assert counts == {"trajectory_data": 4}
+
+    monkeypatch.setattr(json_io, "ijson", None)
+    assert json_io.scan_json(target, keep, count) == (values, counts)
+
+
+def test_scan_json_counts_top_level_array(tmp_path):
+    target = tmp_path / "frames.json"
+    target.write_text(json.dumps([{"time": 0}, {"time": 1}]), encoding="utf-8")
+
+    assert json_io.scan_json(target, ("config",), ("",)) == ({}, {"": 2})
+
+
+def test_scan_json_accepts_nan_written_by_stdlib(tmp_path, monkeypatch):
+    target = tmp_path / "data.json"
+    target.write_text(json.dumps({"statistics": {"avg_speed": float("nan")}, "trajectory_data": [1, 2]}),
+                      encoding="utf-8")
+
+    for threshold in (0, 1 << 30):
+        monkeypatch.setattr(json_io, "_STREAM_MIN_BYTES", threshold)
+        values, counts = json_io.scan_json(target, ("statistics",), ("trajectory_data",))
+        assert values["statistics"]["avg_speed"] != values["statistics"]["avg_speed"]
+        assert counts == {"trajectory_data": 2}
+
+
+def test_scan_json_stops_after_kept_keys(tmp_path, monkeypatch):
+    target = tmp_path / "data.json"
+    # 尾部故意截断：只要在读到它之前停止就不会报错
+    target.write_bytes(b'{"metadata": {"exported_at": "t"}, "config": 1, "trajectory_data": [1, 2, ')
+    monkeypatch.setattr(json_io, "_STREAM_MIN_BYTES", 0)
+
+    values, counts = json_io.scan_json(target, ("metadata", "config"))
+
+    assert values == {"metadata": {"exported_at": "t"}, "config": 1}
+    assert counts == {}
+
+
+def test_read_json_mmap_path_matches_plain_read(tmp_path, monkeypatch):
+    target = tmp_path / "data.json"
+    payload = {"config": {"a": 1}, "statistics": {"avg_speed": float("nan")}, "samples": [1.5, "x"]}
+    target.write_text(json.dumps(payload), encoding="utf-8")
+
+    plain = json_io.read_json(target)
+    monkeypatch.setattr(json_io, "_MMAP_MIN_BYTES", 0)
+    mapped = json_io.read_json(target)
+
+    assert mapped["config"] == plain["config"] == {"a": 1}
+    assert mapped["samples"] == plain["samples"]
+    assert mapped["statistics"]["avg_speed"] != mapped["statistics"]["avg_speed"]
+
+
+def test_is_strict_json_rejects_nan_literals(monkeypatch):
+    assert json_io.is_strict_json(b'{"speed": 1.5}')
+    assert not json_io.is_strict_json(json.dumps({"speed": float("nan")}).encode())
+    assert not json_io.is_strict_json(b'{"speed": ')
+
+    monkeypatch.setattr(json_io, "orjson", None)
+    assert json_io.is_strict_json(b'{"speed": 1.5}')
+    assert not json_io.is_strict_json(b'{"speed": Infinity}')
@@ -38,7 +38,7 @@ interface EvalMetrics {
     total_vehicles?: number;
     segment_boundaries?: number[];
     gantry_stats?: GantryStat[];
-    match_details?: any[];
+    match_details?: MatchDetailColumns;
     type_metrics?: Record<string, any>;
 }
 
@@ -51,6 +51,22 @@ interface OutputFile {
     meta?: Record<string, any>;
 }
 
+/** 匹配明细（后端按列返回，每个字段一个等长数组） */
+interface MatchDetailColumns {
+    alert_time: number[];
+    truth_time: number[];
+    rule_name: string[];
+    event_type: (number | string)[];
+    severity: string[];
+    position_km: number[];
+    matched: boolean[];
+}
+
+const EMPTY_MATCH_DETAILS: MatchDetailColumns = {
+    alert_time: [], truth_time: [], rule_name: [], event_type: [],
+    severity: [], position_km: [], matched: [],
+};
+
 const DEFAULT_METRICS: EvalMetrics = {
     precision: 0, recall: 0, f1_score: 0,
     detection_delay_avg: 0, detection_delay_max: 0,
@@ -298,23 +314,24 @@ export function EvaluationPage() {
     const fmtTime = (iso: string) => { try { return new Date(iso).toLocaleString('zh-CN', { month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit' }); } catch { return iso; } };
 
     // 构建时间线数据
-    const timelineAlerts = (metrics.match_details || []).map((m: any) => ({
-        timestamp: m.alert_time || 0,
-        label: m.rule_name || 'alert',
+    const md = metrics.match_details ?? EMPTY_MATCH_DETAILS;
+    const timelineAlerts = md.alert_time.map((t, i) => ({
+        timestamp: t || 0,
+        label: md.rule_name[i] || 'alert',
         type: 'alert' as const,
-        severity: m.severity || 'medium',
+        severity: md.severity[i] || 'medium',
     }));
-    const timelineTruths = (metrics.match_details || []).filter((m: any) => m.truth_time).map((m: any) => ({
-        timestamp: m.truth_time || 0,
-        label: m.event_type || 'truth',
+    const timelineTruths = md.truth_time.flatMap((t, i) => t ? [{
+        timestamp: t,
+        label: String(md.event_type[i] || 'truth'),
         type: 'truth' as const,
-    }));
+    }] : []);
 
     // 构建热力图数据
-    const heatmapData = (metrics.match_details || []).map((m: any) => ({
-        position: m.position_km || Math.random() * 10,
-        time: Math.floor((m.alert_time || 0) / 60),
-        intensity: m.severity === 'critical' ? 1 : m.severity === 'high' ? 0.7 : 0.4,
+    const heatmapData = md.position_km.map((p, i) => ({
+        position: p || Math.random() * 10,
+        time: Math.floor((md.alert_time[i] || 0) / 60),
+        intensity: md.severity[i] === 'critical' ? 1 : md.severity[i] === 'high' ? 0.7 : 0.4,
     }));
 
     const f1Color = metrics.f1_score >= 0.7 ? '#22c55e' : metrics.f1_score >= 0.4 ? '#f59e0b' : '#ef4444';
@@ -6,10 +6,13 @@
 """
 
 import logging
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple
 from collections import defaultdict
 
+import numpy as np
+
 from .alert_context import AlertEvent
 
 logger = logging.getLogger(__name__)
@@ -39,6 +42,16 @@ class GroundTruthEvent:
         return None
 
 
+# 预警允许早于真值的最大时间 (s)
+EARLY_ALERT_TOLERANCE_S = 10.0
+
+# 时间窗口内候选 alert 超过该数量时改用 NumPy 向量化匹配，否则逐个比较
+_VECTOR_MATCH_THRESHOLD = 64
+
+# 参数扫描预计算候选块的元素总数上限，超出时不预计算，逐次现算
+_SWEEP_TILE_BUDGET = 4_000_000
+
+
 # ==================== 匹配记录 ====================
 
 @dataclass
@@ -156,6 +169,167 @@ class CategoryMetrics:
 
 # ==================== 评估引擎 ====================
 
+class AlertTimeIndex:
+    """
+    预警事件的时间排序列式索引
+
+    按 timestamp 排序后拆成 times / positions / has_pos / orig_idx 数组，
+    只依赖预警列表本身，可在不同时间/距离窗口的多次评估间复用。
+    """
+
+    def __init__(self, alert_events: List[AlertEvent]):
+        order = sorted(range(len(alert_events)), key=lambda i: alert_events[i].timestamp)
+        self.times = np.array([alert_events[i].timestamp for i in order], dtype=np.float64)
+        self.positions = np.array(
+            [np.nan if alert_events[i].position_km is None else alert_events[i].position_km
+             for i in order],
+            dtype=np.float64,
+        )
+        self.has_pos = np.array([alert_events[i].position_km is not None for i in order], dtype=bool)
+        self.orig_idx = np.array(order, dtype=np.int64)
+        # 标量路径使用的 Python 列表副本（逐元素访问比索引 ndarray 快）
+        self.times_list = self.times.tolist()
+        self.positions_list = self.positions.tolist()
+        self.has_pos_list = self.has_pos.tolist()
+        self.orig_list = order
+
+    def match(
+        self,
+        gt_time: float,
+        gt_pos_km: float,
+        time_window_s: float,
+        distance_window_km: float,
+        used: bytearray,
+    ) -> Tuple[int, float, float]:
+        """
+        在时间窗口内为一个真值挑选得分最低的未使用 alert
+
+        得分 = |时间差| + 距离差 * 100，同分时取原列表中靠前的 alert。
+
+        Returns:
+            (排序后下标, 检测延迟, 位置误差)，无可匹配 alert 时下标为 -1
+        """
+        # 二分边界放宽 1s，精确的窗口判断逐候选完成，与逐项比较结果一致
+        lo = bisect_left(self.times_list, gt_time - EARLY_ALERT_TOLERANCE_S - 1.0)
+        hi = bisect_right(self.times_list, gt_time + time_window_s + 1.0)
+        if hi - lo > _VECTOR_MATCH_THRESHOLD:
+            return self._match_vectorized(lo, hi, gt_time, gt_pos_km, time_window_s, distance_window_km, used)
+
+        times, positions, has_pos, orig = self.times_list, self.positions_list, self.has_pos_list, self.orig_list
+        best_k, best_score = -1, float('inf')
+        best_delay = best_dist = 0.0
+        for j in range(lo, hi):
+            if used[j]:
+                continue
+            # alert 必须在真值之后（允许10s提前），且不超过时间/距离窗口
+            time_diff = times[j] - gt_time
+            if time_diff < -EARLY_ALERT_TOLERANCE_S or time_diff > time_window_s:
+                continue
+            if has_pos[j]:
+                dist_diff = abs(positions[j] - gt_pos_km)
+                if not dist_diff <= distance_window_km:
+                    continue
+            else:
+                dist_diff = 0.0
+            score = abs(time_diff) + dist_diff * 100
+            if score < best_score or (score == best_score and orig[j] < orig[best_k]):
+                best_k, best_score = j, score
+                best_delay, best_dist = time_diff, dist_diff
+        return best_k, best_delay, best_dist
+
+    def sweep_tiles(
+        self,
+        gt_points: List[Tuple[float, float]],
+        max_time_window_s: float,
+    ) -> Optional[list]:
+        """
+        为窗口参数扫描预计算每个真值的候选块
+
+        候选较多 (走向量化路径) 的真值保存 (lo, 时间差, 距离差, 得分) 数组，
+        覆盖 max_time_window_s 内的全部候选；扫描中每个取值只需按窗口切片并重算掩码。
+        候选块总元素数超出预算时返回 None。
+        """
+        tiles = []
+        total = 0
+        for gt_time, gt_pos_km in gt_points:
+            lo = bisect_left(self.times_list, gt_time - EARLY_ALERT_TOLERANCE_S - 1.0)
+            hi = bisect_right(self.times_list, gt_time + max_time_window_s + 1.0)
+            if hi - lo <= _VECTOR_MATCH_THRESHOLD:
+                tiles.append(None)
+                continue
+            total += hi - lo
+            if total > _SWEEP_TILE_BUDGET:
+                return None
+            time_diff = self.times[lo:hi] - gt_time
+            dist_diff = np.where(self.has_pos[lo:hi], np.abs(self.positions[lo:hi] - gt_pos_km), 0.0)
+            tiles.append((lo, time_diff, dist_diff, np.abs(time_diff) + dist_diff * 100))
+        return tiles
+
+    def count_matches(
+        self,
+        gt_points: List[Tuple[float, float]],
+        time_window_s: float,
+        distance_window_km: float,
+        tiles: Optional[list] = None,
+    ) -> int:
+        """
+        按与 AlertEvaluator.evaluate 相同的贪心顺序匹配，只返回匹配数
+
+        参数扫描只需要 TP/FP/FN，跳过 MatchResult 与分类统计的构建。
+        gt_points 为 [(trigger_time, position_km), ...]，tiles 为 sweep_tiles 的结果，
+        二者都可在整个扫描中复用。
+        """
+        used = bytearray(len(self.times_list))
+        matched = 0
+        if tiles is None:
+            for gt_time, gt_pos_km in gt_points:
+                k, _, _ = self.match(gt_time, gt_pos_km, time_window_s, distance_window_km, used)
+                if k >= 0:
+                    used[k] = 1
+                    matched += 1
+            return matched
+
+        times = self.times_list
+        for (gt_time, gt_pos_km), tile in zip(gt_points, tiles):
+            if tile is not None:
+                lo, time_diff, dist_diff, score = tile
+                n = bisect_right(times, gt_time + time_window_s + 1.0) - lo
+            if tile is None or n <= _VECTOR_MATCH_THRESHOLD or n > len(time_diff):
+                k, _, _ = self.match(gt_time, gt_pos_km, time_window_s, distance_window_km, used)
+            else:
+                k, _, _ = self._pick_vectorized(
+                    lo, lo + n, time_diff[:n], dist_diff[:n], score[:n],
+                    time_window_s, distance_window_km, used,
+                )
+            if k >= 0:
+                used[k] = 1
+                matched += 1
+        return matched
+
+    def _match_vectorized(self, lo, hi, gt_time, gt_pos_km, time_window_s, distance_window_km, used):
+        """候选较多时的 NumPy 向量化版本，语义与 match 相同"""
+        time_diff = self.times[lo:hi] - gt_time
+        dist_diff = np.where(self.has_pos[lo:hi], np.abs(self.positions[lo:hi] - gt_pos_km), 0.0)
+        score = np.abs(time_diff) + dist_diff * 100
+        return self._pick_vectorized(lo, hi, time_diff, dist_diff, score, time_window_s, distance_window_km, used)
+
+    def _pick_vectorized(self, lo, hi, time_diff, dist_diff, score, time_window_s, distance_window_km, used):
+        """在 [lo, hi) 候选中按窗口掩码挑选得分最低、原序靠前的未使用 alert"""
+        ok = (
+            ~np.frombuffer(used, dtype=np.bool_)[lo:hi]
+            & (time_diff >= -EARLY_ALERT_TOLERANCE_S)
+            & (time_diff <= time_window_s)
+            & (dist_diff <= distance_window_km)
+        )
+        if not ok.any():
+            return -1, 0.0, 0.0
+        cand = np.flatnonzero(ok)
+        cand_score = score[cand]
+        tied = cand[cand_score == cand_score.min()]
+        k = int(tied[np.argmin(self.orig_idx[lo + tied])])
+        return lo + k, float(time_diff[k]), float(dist_diff[k])
+
+
 class AlertEvaluator:
     """
     预警评估引擎
@@ -176,6 +350,7 @@ class AlertEvaluator:
         self,
         ground_truths: List[GroundTruthEvent],
         alert_events: List[AlertEvent],
+        index: Optional[AlertTimeIndex] = None,
     ) -> Tuple[EvaluationMetrics, List[MatchResult], CategoryMetrics]:
         """
         执行评估
@@ -183,48 +358,32 @@ class AlertEvaluator:
         Args:
             ground_truths: 真实异常事件列表
             alert_events: 规则引擎触发的预警事件列表
+            index: 由同一 alert_events 预先构建的时间索引（多次评估同一批预警时复用）
 
         Returns:
             (总体指标, 匹配详情, 按类别细分指标)
         """
-        # 标记哪些 alert 已被匹配
-        used_alerts = set()
         matches: List[MatchResult] = []
         detection_delays: List[float] = []
         position_errors: List[float] = []
 
+        # 预警按时间排序的列式索引，每个真值只需二分定位时间窗口内的候选
+        if index is None:
+            index = AlertTimeIndex(alert_events)
+        used = bytearray(len(alert_events))  # 按排序后下标标记已匹配的 alert
+
         # 1. 对每个真值事件，找最近的匹配 alert
         for gt in ground_truths:
             best_alert = None
-            best_score = float('inf')
-
-            for i, alert in enumerate(alert_events):
-                if i in used_alerts:
-                    continue
-
-                # 时间差
-                time_diff = alert.timestamp - gt.trigger_time
-                if time_diff < -10 or time_diff > self.time_window_s:
-                    # alert 必须在真值之后（允许10s提前），且不超过窗口
-                    continue
-
-                # 空间差
-                if alert.position_km is not None:
-                    dist_diff = abs(alert.position_km - gt.position_km)
-                    if dist_diff > self.distance_window_km:
-                        continue
-                else:
-                    dist_diff = 0.0
-
-                # 综合得分（时间优先）
-                score = abs(time_diff) + dist_diff * 100  # 加权
-                if score < best_score:
-                    best_score = score
-                    best_alert = (i, alert, time_diff, dist_diff)
+            k, delay, dist_err = index.match(
+                gt.trigger_time, gt.position_km, self.time_window_s, self.distance_window_km, used,
+            )
+            if k >= 0:
+                used[k] = 1
+                best_alert = (alert_events[index.orig_list[k]], delay, dist_err)
 
             if best_alert:
-                idx, alert, delay, dist_err = best_alert
-                used_alerts.add(idx)
+                alert, delay, dist_err = best_alert
                 matches.append(MatchResult(
                     ground_truth=gt,
                     alert_event=alert,
@@ -244,7 +403,7 @@ class AlertEvaluator:
         # 2. 计算总体指标
         tp = sum(1 for m in matches if m.matched)
         fn = sum(1 for m in matches if not m.matched)
-        fp = len(alert_events) - len(used_alerts)  # 未匹配的 alert
+        fp = len(alert_events) - sum(used)  # 未匹配的 alert
 
         metrics = EvaluationMetrics(
             total_ground_truths=len(ground_truths),
@@ -30,7 +30,7 @@ class TimeSeriesPredictor:
         """
         将时序窗口的 2D 数组 (Steps, Features) 展平为 1D 数组 (Steps * Features)
         """
-        return np.array(x_sequence).flatten()
+        return np.array(x_sequence, dtype=np.float32).flatten()
 
     def _prepare_data(self, dataset: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, List[Any]]:
         """
@@ -43,7 +43,7 @@ class TimeSeriesPredictor:
 
         samples = dataset.get("samples", [])
         
-        X_list = []
+        x_seqs = []
         y_list = []
         info_list = []
 
@@ -64,8 +64,7 @@ class TimeSeriesPredictor:
             if y_label is None:
                 continue
                 
-            flat_x = self._flatten_sequence(x_seq)
-            X_list.append(flat_x)
+            x_seqs.append(x_seq)
             y_list.append(y_label)
             
             info_list.append({
@@ -75,7 +74,12 @@ class TimeSeriesPredictor:
                 "y_seq": y_seq, # 完整真实序列保留作后续延迟分析
             })
 
-        return np.array(X_list), np.array(y_list), info_list
+        if not x_seqs:
+            return np.array([]), np.array(y_list), info_list
+        # 所有窗口一次性转换为 (样本, 步数, 特征) 数组再展平，避免逐样本创建小数组
+        # 决策树内部本就以 float32 比较特征，直接按 float32 构造可减半内存且省去 fit/predict 时的类型转换拷贝
+        X = np.array(x_seqs, dtype=np.float32).reshape(len(x_seqs), -1)
+        return X, np.array(y_list), info_list
 
     def train(self, dataset: Dict[str, Any], params: Dict[str, Any] = None) -> Dict[str, Any]:
         """
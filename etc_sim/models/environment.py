@@ -8,11 +8,14 @@
 - 支持动态天气变化
 """
 
+from bisect import bisect_right
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Iterable, Optional, List, Tuple
 from enum import Enum
 import math
 
+import numpy as np
+
 
 class WeatherType(Enum):
     """天气类型"""
@@ -112,6 +115,61 @@ class GradientSegment:
         return self.start_km <= position_km < self.end_km
 
 
+class GradientTable:
+    """坡度分段的列式索引
+    
+    分段按起点排序后拆成 start/end/gradient 三个 float64 数组，
+    单点查询用 bisect 二分，批量查询用 np.searchsorted 向量化。
+    分段相互重叠时二分无法保证"按列表顺序第一个命中"的语义，退回线性扫描。
+    
+    Args:
+        segments: 具有 start_km / end_km / gradient_percent 属性的分段序列
+    """
+    
+    def __init__(self, segments: Iterable = ()):
+        # 空区间不会命中任何位置，直接丢弃
+        self._segments = [s for s in segments if s.start_km < s.end_km]
+        ordered = sorted(self._segments, key=lambda s: s.start_km)
+        self.start = np.array([s.start_km for s in ordered], dtype=np.float64)
+        self.end = np.array([s.end_km for s in ordered], dtype=np.float64)
+        self.gradient = np.array([s.gradient_percent for s in ordered], dtype=np.float64)
+        self.overlapping = bool(np.any(self.start[1:] < self.end[:-1]))
+        # 单点查询走 Python 列表，避免标量调用 numpy 的固定开销
+        self._start_list = self.start.tolist()
+        self._end_list = self.end.tolist()
+        self._gradient_list = self.gradient.tolist()
+    
+    def __len__(self) -> int:
+        return len(self._segments)
+    
+    def lookup(self, position_km: float) -> float:
+        """查询单个位置的坡度百分比，不在任何分段内时返回 0.0"""
+        if self.overlapping:
+            for segment in self._segments:
+                if segment.start_km <= position_km < segment.end_km:
+                    return segment.gradient_percent
+            return 0.0
+        idx = bisect_right(self._start_list, position_km) - 1
+        if idx >= 0 and position_km < self._end_list[idx]:
+            return self._gradient_list[idx]
+        return 0.0
+    
+    def lookup_many(self, positions_km) -> np.ndarray:
+        """批量查询多个位置的坡度百分比"""
+        positions = np.asarray(positions_km, dtype=np.float64)
+        if self.overlapping:
+            return np.array([self.lookup(p) for p in positions.ravel()]).reshape(positions.shape)
+        result = np.zeros(positions.shape, dtype=np.float64)
+        if not len(self._segments):
+            return result
+        idx = np.searchsorted(self.start, positions, side='right') - 1
+        valid = idx >= 0
+        safe_idx = np.where(valid, idx, 0)
+        hit = valid & (positions < self.end[safe_idx])
+        result[hit] = self.gradient[safe_idx[hit]]
+        return result
+
+
 @dataclass 
 class EnvironmentConfig:
     """环境配置
@@ -169,6 +227,7 @@ class EnvironmentModel:
     def __init__(self, config: EnvironmentConfig = None):
         self.config = config or EnvironmentConfig()
         self._weather_effect = self._get_current_weather_effect()
+        self._gradient_table = GradientTable(self.config.gradient_segments)
     
     def _get_current_weather_effect(self) -> WeatherEffect:
         """获取当前天气效果"""
@@ -190,10 +249,12 @@ class EnvironmentModel:
         """添加坡度分段"""
         segment = GradientSegment(start_km, end_km, gradient_percent)
         self.config.gradient_segments.append(segment)
+        self._gradient_table = GradientTable(self.config.gradient_segments)
     
     def clear_gradients(self):
         """清除所有坡度分段"""
         self.config.gradient_segments.clear()
+        self._gradient_table = GradientTable()
     
     # ==================== 天气影响 ====================
     
@@ -272,10 +333,11 @@ class EnvironmentModel:
         Returns:
             坡度百分比 (+上坡, -下坡)
         """
-        for segment in self.config.gradient_segments:
-            if segment.contains(position_km):
-                return segment.gradient_percent
-        return 0.0  # 默认平路
+        return self._gradient_table.lookup(position_km)  # 不在任何分段内时为平路
+    
+    def get_gradients_at(self, positions_km) -> np.ndarray:
+        """批量获取多个位置的坡度百分比"""
+        return self._gradient_table.lookup_many(positions_km)
     
     def get_gradient_acceleration_adjust(self, position_km: float, 
                                          vehicle_type: str = 'car') -> float:
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import math
 import logging
 from typing import List, Dict, Optional, Tuple, Any
@@ -21,6 +22,8 @@ class TimeSeriesFeatureExtractor:
     BASE_FEATURES = ['flow', 'density', 'avg_speed']
     EXTRA_FEATURES = ['speed_variance', 'occupancy', 'headway_mean']
     ALL_FEATURES = BASE_FEATURES + EXTRA_FEATURES
+    # 数据集构造逻辑 (build_dataset_from_history 的输出) 变化时递增，使缓存的重建结果失效
+    DATASET_VERSION = 1
 
     def __init__(self, 
                  step_seconds: float = 60.0, 
@@ -366,42 +369,37 @@ class TimeSeriesFeatureExtractor:
         
         feature_cols.extend(custom_cols)
                 
-        # 3. 构造标注 Y (基于 anomaly_logs)
-        gt_active_intervals = []
+        # 3. 构造标注 Y (基于 anomaly_logs)，按路段分组以免每个窗口扫描全部异常
+        gt_intervals_by_segment = defaultdict(list)
         for log in anomaly_logs:
             trigger_t = log.get('time', 0)
-            end_t = trigger_t + 600
-            gt_active_intervals.append({
-                'start': trigger_t,
-                'end': end_t,
-                'segment': log.get('segment', 0),
-                'type': log.get('type', 1)
-            })
+            gt_intervals_by_segment[log.get('segment', 0)].append((trigger_t, trigger_t + 600))
             
         samples = []
         
-        # 4. 滑动窗口切割序列
+        # 4. 滑动窗口切割序列：每个路段用 sliding_window_view 一次生成全部窗口 (只读视图，不复制)，
+        #    标注也按窗口结束时刻整体比较，Python 循环只负责组装样本字典
+        w = self.window_size_steps
         for seg, group in df_features.groupby('segment'):
-            group = group.sort_values('time_bin').reset_index(drop=True)
+            if len(group) < w:
+                continue
+            group = group.sort_values('time_bin')
+            values = group[feature_cols].to_numpy()
+            end_times = group['time_bin'].to_numpy()[w - 1:]
+            # (窗口数, 特征数, w) -> (窗口数, w, 特征数)
+            windows = sliding_window_view(values, w, axis=0).transpose(0, 2, 1).tolist()
             
-            for i in range(self.window_size_steps, len(group) + 1):
-                window_data = group.iloc[i - self.window_size_steps:i]
-                current_time = window_data.iloc[-1]['time_bin']
-                
-                x_seq = window_data[feature_cols].values.tolist()
-                
-                has_anomaly = any(
-                    a['segment'] == seg and 
-                    a['start'] <= current_time and 
-                    a['end'] >= current_time
-                    for a in gt_active_intervals
-                )
-                
+            has_anomaly = np.zeros(len(end_times), dtype=bool)
+            for start, end in gt_intervals_by_segment.get(seg, ()):
+                has_anomaly |= (start <= end_times) & (end >= end_times)
+            
+            seg_name = str(seg)
+            for x_seq, current_time, anomaly in zip(windows, end_times.tolist(), has_anomaly.tolist()):
                 samples.append({
                     "X_sequence": x_seq,
-                    "Y_label": 1 if has_anomaly else 0,
+                    "Y_label": 1 if anomaly else 0,
                     "metadata": {
-                        "segment": str(seg),
+                        "segment": seg_name,
                         "time_end": float(current_time),
                         "run_id": run_id
                     }
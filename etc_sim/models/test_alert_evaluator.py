@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from etc_sim.models.alert_context import AlertEvent
+from etc_sim.models.alert_evaluator import AlertEvaluator, GroundTruthEvent
+
+
+def test_window_matching_prefers_best_score_then_list_order():
+    gts = [
+        GroundTruthEvent(1, 1, trigger_time=100.0, position_m=5000.0, segment_idx=0, min_speed_kmh=0.0),
+        GroundTruthEvent(2, 2, trigger_time=400.0, position_m=9000.0, segment_idx=0, min_speed_kmh=0.0),
+    ]
+    alerts = [
+        AlertEvent("late", "high", timestamp=300.0, position_km=5.0),      # 超出时间窗口
+        AlertEvent("tie_a", "high", timestamp=110.0, position_km=5.0),
+        AlertEvent("early", "high", timestamp=89.0, position_km=5.0),      # 提前超过 10s
+        AlertEvent("tie_b", "high", timestamp=90.0, position_km=5.0),      # 与 tie_a 同分，列表靠后
+        AlertEvent("far", "high", timestamp=401.0, position_km=12.0),      # 超出距离窗口
+        AlertEvent("no_pos", "high", timestamp=430.0, position_km=None),
+    ]
+
+    metrics, matches, _ = AlertEvaluator(time_window_s=120.0, distance_window_km=2.0).evaluate(gts, alerts)
+
+    assert [m.alert_event.rule_name for m in matches] == ["tie_a", "no_pos"]
+    assert matches[1].detection_delay == 30.0 and matches[1].position_error_km == 0.0
+    assert (metrics.true_positives, metrics.false_positives, metrics.false_negatives) == (2, 4, 0)
+
+
+def test_count_matches_agrees_with_evaluate_across_window_sweep():
+    import random
+
+    from etc_sim.models.alert_evaluator import AlertTimeIndex
+
+    rng = random.Random(7)
+    gts = [
+        GroundTruthEvent(i, 1, trigger_time=float(rng.randrange(600)), position_m=rng.random() * 10000,
+                         segment_idx=0, min_speed_kmh=0.0)
+        for i in range(60)
+    ]
+    alerts = [
+        AlertEvent("r", "high", timestamp=float(rng.randrange(600)),
+                   position_km=None if i % 7 == 0 else round(rng.random() * 10, 1))
+        for i in range(400)
+    ]
+    index = AlertTimeIndex(alerts)
+    points = [(gt.trigger_time, gt.position_km) for gt in gts]
+    tiles = index.sweep_tiles(points, 300.0)
+
+    assert any(tile is not None for tile in tiles)
+    for window in (5.0, 60.0, 150.0, 300.0):
+        metrics, _, _ = AlertEvaluator(time_window_s=window, distance_window_km=2.0).evaluate(gts, alerts)
+        assert index.count_matches(points, window, 2.0) == metrics.true_positives
+        assert index.count_matches(points, window, 2.0, tiles=tiles) == metrics.true_positives
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from etc_sim.models.environment import EnvironmentModel, GradientSegment, GradientTable
+
+
+def test_gradient_lookup_matches_segment_boundaries():
+    env = EnvironmentModel()
+    env.add_gradient_segment(10.0, 12.0, 5.0)
+    env.add_gradient_segment(2.0, 4.0, -3.0)
+
+    assert env.get_gradient_at(1.9) == 0.0
+    assert env.get_gradient_at(2.0) == -3.0
+    assert env.get_gradient_at(4.0) == 0.0
+    assert env.get_gradient_at(11.5) == 5.0
+    assert env.get_gradients_at([2.0, 4.0, 10.0, 12.0]).tolist() == [-3.0, 0.0, 5.0, 0.0]
+
+    env.clear_gradients()
+    assert env.get_gradient_at(11.5) == 0.0
+
+
+def test_overlapping_segments_keep_first_match_order():
+    table = GradientTable([
+        GradientSegment(5.0, 10.0, 2.0),
+        GradientSegment(0.0, 8.0, -1.0),
+    ])
+
+    assert table.overlapping
+    assert table.lookup(6.0) == 2.0
+    assert table.lookup(3.0) == -1.0
+    assert table.lookup_many([3.0, 6.0, 9.0, 11.0]).tolist() == [-1.0, 2.0, 2.0, 0.0]
@@ -6,6 +6,7 @@ ETC 门架异常检测示例脚本
     
     gate_data.list_files(ext=".csv")   → 列出 output 中的文件
     gate_data.read_csv(path)           → 读取 CSV 为字典列表
+    gate_data.read_csv_df(path)        → 读取 CSV 为 pandas DataFrame (大文件推荐)
     gate_data.read_json(path)          → 读取 JSON 文件
 """
 